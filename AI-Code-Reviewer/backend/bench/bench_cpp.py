@@ -0,0 +1,85 @@
+"""
+Compare in-process cpplint/lizard (engine pool) against spawning their CLIs per request.
+
+Run from the backend directory:
+    python -m bench.bench_cpp --requests 50 --concurrency 4
+
+The spawn path is the one cpp_tools used before the engine: `cpplint -` on
+stdin and `lizard --csv` on a scratch file. Both paths must report the same
+findings; the script exits non-zero if they differ.
+"""
+import argparse
+import asyncio
+import csv
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import timing  # noqa: E402
+from services import cpp_tools  # noqa: E402
+from utils import process_pool  # noqa: E402
+from utils.common import run_cmd, which  # noqa: E402
+from utils.file_handler import workspace  # noqa: E402
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "test_code_cpp.cpp")
+
+_CPPLINT_RE = re.compile(r"^-:(\d+):\s+(.*?)\s+\[([\w/+-]+)\] \[(\d)\]$")
+
+
+async def spawn_analyze(code, language=None):
+    async def cpplint():
+        rc, out, err = await run_cmd([which("cpplint"), "-"], input_text=code)
+        return [
+            (int(m.group(1)), m.group(3))
+            for m in map(_CPPLINT_RE.match, err.splitlines()) if m
+        ]
+
+    async def lizard():
+        async with workspace.scratch_file(code, ".cpp") as path:
+            rc, out, err = await run_cmd([which("lizard"), "--csv", path])
+        return [(rec[7], int(rec[1])) for rec in csv.reader(out.splitlines()) if len(rec) >= 11]
+
+    lint, rows = await asyncio.gather(cpplint(), lizard())
+    return {"lint": lint, "complexity": rows}
+
+
+def _summary(result):
+    """Comparable view of either path's output."""
+    lint = result["lint"]
+    if lint and isinstance(lint[0], dict):
+        lint = [(i["line"], i["code"]) for i in lint]
+    rows = result["complexity"]
+    if rows and isinstance(rows[0], dict):
+        rows = [(r["name"], r["complexity"]) for r in rows]
+    return sorted(lint), sorted(rows)
+
+
+async def main(args):
+    with open(args.file, encoding="utf-8") as f:
+        code = f.read()
+
+    if not (which("cpplint") and which("lizard")):
+        sys.exit("cpplint and lizard CLIs are needed for the spawn baseline (pip install cpplint lizard)")
+
+    await process_pool.warm()
+    spawned, engine = await spawn_analyze(code), await cpp_tools.analyze(code, language="cpp")
+    if _summary(spawned) != _summary(engine):
+        print("spawn and engine results differ:", _summary(spawned), _summary(engine), sep="\n")
+        sys.exit(1)
+
+    lat, wall = await timing.run(spawn_analyze, code, args.requests, args.concurrency, "cpp")
+    timing.report("analyze spawn", lat, wall)
+    lat, wall = await timing.run(cpp_tools.analyze, code, args.requests, args.concurrency, "cpp")
+    timing.report("analyze engine", lat, wall)
+    process_pool.shutdown()
+    workspace.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--file", default=SAMPLE)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,45 @@
+"""
+Compare the warm Node worker pool against spawning eslint/prettier per request.
+
+Run from the backend directory (needs `npm install` so eslint/prettier exist):
+    python -m bench.bench_javascript --requests 50 --concurrency 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import timing  # noqa: E402
+from services import javascript_tools  # noqa: E402
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "test_code_js.js")
+
+
+async def main(args):
+    with open(args.file, encoding="utf-8") as f:
+        code = f.read()
+
+    for op in ("analyze", "format_code"):
+        fn = getattr(javascript_tools, op)
+
+        javascript_tools.JS_WORKERS = 0
+        lat, wall = await timing.run(fn, code, args.requests, args.concurrency, "javascript")
+        timing.report(f"{op} spawn", lat, wall)
+
+        javascript_tools.JS_WORKERS = args.workers
+        javascript_tools.pool.size = args.workers
+        await javascript_tools.pool.warm()
+        lat, wall = await timing.run(fn, code, args.requests, args.concurrency, "javascript")
+        timing.report(f"{op} warm pool", lat, wall)
+        await javascript_tools.pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--file", default=SAMPLE)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=2)
+    asyncio.run(main(parser.parse_args()))
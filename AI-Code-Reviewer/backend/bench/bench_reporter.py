@@ -0,0 +1,76 @@
+"""
+Render PDF reports for 1k/10k/50k-line submissions and record time and peak RSS.
+
+Each size runs in a fresh interpreter so peak RSS is not shared between runs:
+    python bench/bench_reporter.py --sizes 1000 10000 50000 --highlight
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SAMPLE = os.path.join(BACKEND_DIR, "tests", "test_code2.py")
+
+
+def make_code(lines):
+    with open(SAMPLE, encoding="utf-8") as f:
+        sample = f.read().splitlines()
+    out = []
+    while len(out) < lines:
+        out.extend(sample)
+    return "\n".join(out[:lines])
+
+
+def child(lines, highlight):
+    from services import reporter
+    from utils.results import issue
+
+    code = make_code(lines)
+    analysis = {
+        "lint": [issue(i, 80, "E501", "line too long", "info") for i in range(1, lines, 7)],
+        "complexity": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "report.pdf")
+        start = time.perf_counter()
+        reporter.create_pdf_report("python", code, path, analysis, highlight=highlight)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+    # ru_maxrss is in KiB on Linux.
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"lines": lines, "highlight": highlight, "seconds": round(elapsed, 3),
+                      "peak_rss_mb": round(peak_mb, 1), "pdf_kb": round(size / 1024, 1)}))
+
+
+def main(args):
+    results = []
+    for lines in args.sizes:
+        cmd = [sys.executable, __file__, "--child", str(lines)] + (["--highlight"] if args.highlight else [])
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        results.append(result)
+        print(f"{lines:>7} lines  {result['seconds']:8.2f} s  {result['peak_rss_mb']:8.1f} MB peak RSS  "
+              f"{result['pdf_kb']:9.1f} KB pdf")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--highlight", action="store_true", help="enable syntax highlighting (needs pygments)")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.highlight)
+    else:
+        main(args)
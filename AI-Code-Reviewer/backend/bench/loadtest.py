@@ -0,0 +1,287 @@
+"""
+Offline load test for /api/analyze, /api/format and /api/report, plus the
+LLM review path (ai_review=true) on /api/analyze and /api/analyze/stream.
+
+Starts bench/stub_llm.py in place of OpenRouter and a uvicorn backend with
+throw-away cache/report directories, then drives every (endpoint, language,
+size) scenario at the requested concurrency using the samples in tests/ and
+generated large files. Prints p50/p95/p99 latency, throughput and peak RSS
+(backend process plus its worker children).
+
+    python bench/loadtest.py --concurrency 8 --requests 40 --save bench/baseline.json
+    python bench/loadtest.py --concurrency 8 --requests 40 --compare bench/baseline.json
+
+--compare exits with status 1 if any scenario's p95 or throughput is worse
+than the baseline by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS_DIR = os.path.join(BACKEND_DIR, "tests")
+
+SAMPLES = {
+    "python": "test_code_python.py",
+    "javascript": "test_code_js.js",
+    "java": "BadClass.java",
+    "cpp": "test_code_cpp.cpp",
+    "go": "test_code_go.go",
+}
+COMMENT = {"python": "#"}
+ENDPOINTS = ["analyze", "format", "report", "analyze-ai", "stream-ai"]
+# Scenarios whose requests must not be served from a cache or coalesced.
+UNIQUE_ENDPOINTS = {"report", "analyze-ai", "stream-ai"}
+
+
+def load_sample(language, lines=None):
+    with open(os.path.join(TESTS_DIR, SAMPLES[language]), encoding="utf-8") as f:
+        sample = f.read()
+    if not lines:
+        return sample
+    out = []
+    while len(out) < lines:
+        out.extend(sample.splitlines())
+    return "\n".join(out[:lines]) + "\n"
+
+
+def unique(code, language, n):
+    """Defeat content-addressed caching/dedup with a trailing comment."""
+    return f"{code}\n{COMMENT.get(language, '//')} loadtest {time.time_ns()} {n}\n"
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def rss_mb(pid):
+    """Resident set size of `pid` and all its descendants, in MB."""
+    total, stack = 0, [pid]
+    while stack:
+        p = stack.pop()
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+            # Children hang off the thread that forked them (the engine's
+            # fork server starts from a to_thread worker), so ask every task.
+            for task in os.listdir(f"/proc/{p}/task"):
+                with open(f"/proc/{p}/task/{task}/children") as f:
+                    stack.extend(int(c) for c in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total / 1024
+
+
+async def wait_ready(client, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("backend did not become ready")
+
+
+def _reviewed(result):
+    review = result.get("ai_review") if isinstance(result, dict) else None
+    return isinstance(review, str) and bool(review) and not review.startswith(("Error", "AI Error", "AI Review failed"))
+
+
+async def one_request(client, endpoint, language, code):
+    files = {"file": ("code", code.encode("utf-8"))}
+    data = {"language": language}
+    if endpoint == "analyze-ai":
+        data.update(no_cache="true", ai_review="true")
+        r = await client.post("/api/analyze", data=data, files=files)
+        return r.status_code == 200 and _reviewed(r.json())
+    if endpoint == "stream-ai":
+        data.update(no_cache="true", ai_review="true")
+        tokens, result, event = 0, None, None
+        async with client.stream("POST", "/api/analyze/stream", data=data, files=files) as r:
+            if r.status_code != 200:
+                return False
+            async for line in r.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:") and event == "token":
+                    tokens += 1
+                elif line.startswith("data:") and event == "result":
+                    result = json.loads(line[5:])
+        return tokens > 0 and _reviewed(result)
+    if endpoint in ("analyze", "format"):
+        data["no_cache"] = "true"
+        r = await client.post(f"/api/{endpoint}", data=data, files=files)
+        return r.status_code == 200 and "error" not in r.json()
+
+    r = await client.post("/api/report", data=data, files=files)
+    if r.status_code != 202:
+        return False
+    job_id = r.json()["job_id"]
+    while True:
+        status = (await client.get(f"/api/report/{job_id}", params={"wait": 25})).json()
+        if status.get("status") == "done":
+            break
+        if status.get("status") != "queued" and status.get("status") != "running":
+            return False
+    r = await client.get(f"/api/report/{job_id}/download")
+    return r.status_code == 200
+
+
+async def run_scenario(client, pid, endpoint, language, code, requests, concurrency):
+    latencies, errors = [], 0
+    peak = rss_mb(pid)
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for n in counter:
+            payload = unique(code, language, n) if endpoint in UNIQUE_ENDPOINTS else code
+            start = time.perf_counter()
+            try:
+                ok = await one_request(client, endpoint, language, payload)
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    async def sample_rss(done):
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, rss_mb(pid))
+            await asyncio.sleep(0.2)
+
+    done = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(done))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await sampler
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "throughput_rps": round(requests / elapsed, 2),
+        "peak_rss_mb": round(peak, 1),
+    }
+
+
+def start_processes(args, workdir):
+    procs = []
+    env = dict(os.environ)
+    if not args.llm_url:
+        procs.append(subprocess.Popen(
+            [sys.executable, os.path.join(BACKEND_DIR, "bench", "stub_llm.py"),
+             "--port", str(args.llm_port), "--latency", str(args.llm_latency)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+    env.update(
+        OPENROUTER_BASE_URL=args.llm_url or f"http://127.0.0.1:{args.llm_port}/api/v1",
+        OPENROUTER_API_KEY=env.get("OPENROUTER_API_KEY", "stub") if args.llm_url else "stub",
+        RESULT_CACHE_DIR=os.path.join(workdir, "results"),
+        REPORTS_DIR=os.path.join(workdir, "reports"),
+        SNAPSHOT_DIR=os.path.join(workdir, "snapshots"),
+    )
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    procs.append(backend)
+    return backend, procs
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        p95 = (cur["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0
+        rps = (base["throughput_rps"] - cur["throughput_rps"]) / base["throughput_rps"] if base["throughput_rps"] else 0
+        flag = p95 > tolerance or rps > tolerance
+        print(f"{name:<28} p95 {base['p95_ms']:>9.1f} -> {cur['p95_ms']:>9.1f} ms ({p95:+.0%})  "
+              f"rps {base['throughput_rps']:>7.2f} -> {cur['throughput_rps']:>7.2f} ({-rps:+.0%})"
+              + ("  REGRESSION" if flag else ""))
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+async def main(args):
+    scenarios = [
+        (endpoint, language, size)
+        for endpoint in args.endpoints
+        for language in args.languages
+        for size in [None] + args.large_lines
+    ]
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+        backend, procs = start_processes(args, workdir)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency * 2)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}",
+                                         timeout=args.timeout, limits=limits) as client:
+                await wait_ready(client)
+                for endpoint, language, size in scenarios:
+                    code = load_sample(language, size)
+                    name = f"{endpoint}/{language}/{size or 'sample'}"
+                    result = await run_scenario(client, backend.pid, endpoint, language, code,
+                                                args.requests, args.concurrency)
+                    results[name] = result
+                    print(f"{name:<28} p50 {result['p50_ms']:>9.1f}  p95 {result['p95_ms']:>9.1f}  "
+                          f"p99 {result['p99_ms']:>9.1f} ms  {result['throughput_rps']:>7.2f} req/s  "
+                          f"{result['peak_rss_mb']:>7.1f} MB  errors {result['errors']}")
+        finally:
+            for proc in procs:
+                proc.terminate()
+            for proc in procs:
+                proc.wait()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print()
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test for the code-review API")
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS, choices=ENDPOINTS)
+    parser.add_argument("--languages", nargs="+", default=list(SAMPLES), choices=list(SAMPLES))
+    parser.add_argument("--large-lines", nargs="*", type=int, default=[5000],
+                        help="also run each scenario on generated files of these sizes")
+    parser.add_argument("--requests", type=int, default=20, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--llm-port", type=int, default=8099)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--llm-url", help="use an already running LLM endpoint instead of the stub")
+    parser.add_argument("--save", help="write results as JSON (e.g. a new baseline)")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    asyncio.run(main(parser.parse_args()))
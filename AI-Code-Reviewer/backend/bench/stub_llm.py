@@ -0,0 +1,94 @@
+"""
+Local stand-in for the OpenRouter chat-completions API.
+
+Start it and point the backend at it:
+    python bench/stub_llm.py --port 8099 --latency 0.3 --fail-rate 0.1
+    OPENROUTER_BASE_URL=http://127.0.0.1:8099/api/v1 OPENROUTER_API_KEY=stub uvicorn main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def create_app(latency=0.2, jitter=0.0, fail_rate=0.0, fail_status=503, token_delay=0.01):
+    app = FastAPI(title="Stub LLM")
+    app.state.calls = 0
+    app.state.failures = 0
+
+    @app.post("/api/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.calls += 1
+
+        if fail_rate and random.random() < fail_rate:
+            app.state.failures += 1
+            headers = {"Retry-After": "0"} if fail_status == 429 else {}
+            return JSONResponse({"error": {"message": "stub failure", "code": fail_status}},
+                                status_code=fail_status, headers=headers)
+
+        await asyncio.sleep(latency + random.uniform(0, jitter))
+        prompt = body["messages"][-1]["content"]
+        content = (
+            f"Stub review of {len(prompt.splitlines())} prompt lines.\n\n"
+            "- Consider adding docstrings.\n"
+            "- Prefer descriptive variable names."
+        )
+        # Batched prompts (services/llm_batcher.py) get one section per item marker.
+        items = re.findall(r"^=== ITEM \d+ ===$", prompt, re.MULTILINE)
+        if items:
+            content = "\n\n".join(f"{marker}\n{content}" for marker in items)
+        gen_id = f"gen-{uuid.uuid4().hex}"
+
+        if body.get("stream"):
+            async def events():
+                yield ": OPENROUTER PROCESSING\n\n"
+                for word in content.split(" "):
+                    chunk = {"id": gen_id, "object": "chat.completion.chunk", "model": body.get("model"),
+                             "choices": [{"index": 0, "delta": {"content": word + " "}}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(token_delay)
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return {
+            "id": gen_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4},
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {"calls": app.state.calls, "failures": app.state.failures}
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub OpenRouter chat-completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before each reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, seconds")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of calls that fail")
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between streamed tokens")
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(args.latency, args.jitter, args.fail_rate, args.fail_status, args.token_delay),
+        host=args.host, port=args.port, log_level="warning",
+    )
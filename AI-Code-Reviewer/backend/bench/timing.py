@@ -0,0 +1,31 @@
+"""Timing helpers shared by the A/B benchmarks (bench_cpp, bench_javascript)."""
+import asyncio
+import statistics
+import time
+
+
+async def run(fn, code, requests, concurrency, language):
+    """Call `fn(code, language=...)` `requests` times, `concurrency` at a time; return (latencies, wall)."""
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            await fn(code, language=language)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, time.perf_counter() - start
+
+
+def report(label, latencies, wall):
+    latencies = sorted(latencies)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(
+        f"{label:<22} mean {statistics.mean(latencies) * 1000:8.1f} ms   "
+        f"p50 {statistics.median(latencies) * 1000:8.1f} ms   "
+        f"p95 {p95 * 1000:8.1f} ms   "
+        f"{len(latencies) / wall:7.1f} req/s"
+    )
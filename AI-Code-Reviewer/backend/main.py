@@ -1,10 +1,66 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from routers import analysis
+from services import javascript_tools, java_tools, ai_reviewer, report_jobs, llm_batcher
+from utils import process_pool, file_handler, metrics
+from utils.admission import Overloaded
+from utils.compression import CompressionMiddleware
+from utils.responses import ORJSONResponse
+from utils.registry import registry
 
-app = FastAPI(title="AI Code Reviewer API")
 
+async def warm_up():
+    """Fork analyzer workers, start Node workers and probe/warm every tool."""
+    jobs = [process_pool.warm(), registry.start()]
+    if javascript_tools.pool_enabled():
+        jobs.append(javascript_tools.pool.warm())
+    if java_tools.pool_enabled():
+        jobs.append(java_tools.pool.warm())
+    await asyncio.gather(*jobs)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    janitor = asyncio.create_task(file_handler.run_janitor())
+    # Serve "/" right away; /ready flips once warm-up has finished.
+    app.state.warmup = asyncio.create_task(warm_up())
+    yield
+    app.state.warmup.cancel()
+    await javascript_tools.pool.close()
+    await java_tools.pool.close()
+    process_pool.shutdown()
+    report_jobs.shutdown()
+    llm_batcher.batcher.close()
+    await ai_reviewer.close()
+    janitor.cancel()
+    file_handler.workspace.close()
+
+
+app = FastAPI(title="AI Code Reviewer API", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 app.include_router(analysis.router)
 
+@app.exception_handler(Overloaded)
+async def overloaded(request, exc):
+    return JSONResponse({"error": str(exc)}, status_code=429, headers={"Retry-After": str(exc.retry_after)})
+
 @app.get("/")
 def home():
     return {"message": "AI Code Reviewer Backend is running 🚀"}
+
+@app.get("/ready")
+async def ready():
+    warmup = getattr(app.state, "warmup", None)
+    if warmup is None or not warmup.done():
+        return JSONResponse({**registry.status(), "ready": False}, status_code=503)
+    if warmup.cancelled() or warmup.exception():
+        return JSONResponse({**registry.status(), "ready": False, "error": "warm-up failed"}, status_code=503)
+    return registry.status()
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,5 +1,16 @@
-from fastapi import APIRouter, UploadFile, File, Form
-from services import python_tools, javascript_tools, java_tools, cpp_tools, go_tools, reporter
+import asyncio
+import json
+import os
+import orjson
+from fastapi import APIRouter, UploadFile, File, Form, Query, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, FileResponse, Response
+from services import python_tools, javascript_tools, java_tools, cpp_tools, go_tools, ai_reviewer, llm_batcher, batch, report_jobs, report_store, incremental, live
+from services.snapshots import snapshots, version_id
+from utils import metrics, process_pool
+from utils.admission import admission, lane_name, BATCH, INTERACTIVE
+from utils.cache import result_cache, make_key, fingerprint
+from utils.file_handler import QuotaExceeded
+from utils.sandbox import ResourceExceeded
 
 router = APIRouter(prefix="/api", tags=["Code Analysis"])
 
@@ -15,8 +26,120 @@ ANALYZE_MAP = {
     "go": go_tools,
 }
 
+# How each language is named in the LLM review prompt.
+LANGUAGE_NAMES = {
+    "python": "Python",
+    "javascript": "JavaScript",
+    "js": "JavaScript",
+    "typescript": "TypeScript",
+    "java": "Java",
+    "cpp": "C++",
+    "c++": "C++",
+    "c": "C",
+    "go": "Go",
+}
+
+# Upper bound for a whole analyze/format call, across all tools it runs.
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "120"))
+
+
+async def _run_with_timeout(coro, language):
+    try:
+        return await asyncio.wait_for(coro, REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        return {"error": f"Analysis of {language} code timed out after {REQUEST_TIMEOUT:g}s."}
+    except QuotaExceeded as e:
+        return {"error": str(e)}
+    except ResourceExceeded as e:
+        return {"error": str(e), "resource_exceeded": [e.to_dict()]}
+
+
+def _cacheable(result):
+    if not isinstance(result, dict) or "error" in result or result.get("partial") or result.get("resource_exceeded"):
+        return False
+    review = result.get("ai_review")
+    return not (isinstance(review, str) and ai_reviewer.is_failed_review(review))
+
+
+async def _cached(key, lane, work, lang, no_cache=False, priority=INTERACTIVE):
+    """
+    Return the cached result for `key`, or run `work()` in a slot of the
+    admission `lane` and cache it. A full interactive queue raises
+    Overloaded (429).
+    """
+    metrics.set_language(lang)
+    if not no_cache:
+        with metrics.timed("cache_get"):
+            cached = await result_cache.get(key)
+        if cached is not None:
+            return cached
+
+    async with admission.lane(lane).slot(priority):
+        result = await _run_with_timeout(work(), lang)
+    if _cacheable(result):
+        await result_cache.set(key, result)
+    return result
+
+
+async def _run(op, lang, code, no_cache=False, priority=INTERACTIVE):
+    """Dispatch `op` ("analyze" / "format_code") to the language module, through the result cache."""
+    tool = ANALYZE_MAP[lang]
+    return await _cached(
+        make_key(op, lang, code, tool), lane_name(tool),
+        lambda: getattr(tool, op)(code, language=lang),
+        lang, no_cache, priority,
+    )
+
+
+async def _review(lang, code, no_cache=False, priority=INTERACTIVE):
+    """The LLM review of `code`. It is separate from the local analysis and only runs on request."""
+    async def work():
+        return {"ai_review": await llm_batcher.review(code, language=LANGUAGE_NAMES[lang])}
+
+    return await _cached(
+        make_key("review", lang, code, llm_batcher), lane_name(llm_batcher),
+        work, lang, no_cache, priority,
+    )
+
+
+def _with_review(result, review):
+    return {**result, "ai_review": review.get("ai_review", review.get("error"))}
+
+
+async def _analyze(lang, code, no_cache=False, ai_review=False, priority=INTERACTIVE):
+    """Local analysis, plus the LLM review (run concurrently) when `ai_review` is set."""
+    if not ai_review:
+        return await _run("analyze", lang, code, no_cache, priority)
+    result, review = await asyncio.gather(
+        _run("analyze", lang, code, no_cache, priority),
+        _review(lang, code, no_cache, priority),
+    )
+    return _with_review(result, review)
+
+
+async def _with_id(lang, code, result):
+    """
+    Add `analysis_id`, which names the submitted source: /report accepts it
+    instead of a second upload (and /analyze/incremental as `base_id`).
+    """
+    analysis_id = await asyncio.to_thread(snapshots.put, lang, code)
+    return {**result, "analysis_id": analysis_id}
+
+
+def _check_admission(lang, ai_review):
+    """Reject now, while a 429 can still be sent, rather than mid-stream."""
+    admission.lane(lane_name(ANALYZE_MAP[lang])).check()
+    if ai_review:
+        admission.lane(lane_name(llm_batcher)).check()
+
 @router.post("/analyze")
-async def analyze_code(language: str = Form(...), file: UploadFile = File(...)):
+async def analyze_code(
+    language: str = Form(...),
+    file: UploadFile = File(...),
+    no_cache: bool = Form(False),
+    ai_review: bool = Form(False),
+):
+    """Lint and complexity from local tools; set `ai_review` to add the LLM review."""
     content = await file.read()
     code = content.decode("utf-8")
 
@@ -25,10 +148,248 @@ async def analyze_code(language: str = Form(...), file: UploadFile = File(...)):
     if not tool:
         return {"error": "Language " + language + " not supported yet."}
 
-    return tool.analyze(code, language=lang)
+    return await _with_id(lang, code, await _analyze(lang, code, no_cache, ai_review))
+
+
+@router.post("/review")
+async def review_code(language: str = Form(...), file: UploadFile = File(...), no_cache: bool = Form(False)):
+    """Only the LLM review, for clients that fetch it separately from /analyze."""
+    content = await file.read()
+    code = content.decode("utf-8")
+
+    lang = language.lower()
+    if lang not in ANALYZE_MAP:
+        return {"error": "Language " + language + " not supported yet."}
+
+    return await _review(lang, code, no_cache)
+
+
+async def _scoped_analysis(lang, code, ranges, no_cache, ai_review):
+    """Analysis of `code` limited to the changed line `ranges` (new-file numbering)."""
+    # Linters need the whole file for context (imports, names), and their
+    # output is cached by content; only the findings are scoped.
+    result = dict(await _run("analyze", lang, code, no_cache))
+    if "lint" in result:
+        result["lint"] = incremental.scope_lint(result["lint"], ranges)
+    if "complexity" in result:
+        result["complexity"] = incremental.scope_complexity(result["complexity"], ranges)
+    if not ai_review:
+        return result
+
+    async def work():
+        # The LLM only sees the functions that contain changes.
+        spans = await process_pool.run(incremental.touched_spans, code, lang, ranges)
+        review = await ai_reviewer.review_spans(code, LANGUAGE_NAMES[lang], spans, ranges)
+        return {"ai_review": review, "functions": spans}
+
+    review = await _cached(
+        make_key("review-incremental", lang, json.dumps(ranges) + "\n" + code, llm_batcher),
+        lane_name(llm_batcher), work, lang, no_cache,
+    )
+    return {**_with_review(result, review), "functions": review.get("functions", [])}
+
+
+@router.post("/analyze/incremental")
+async def analyze_incremental(
+    language: str = Form(...),
+    file: UploadFile = File(None),
+    diff: str = Form(None),
+    base_id: str = Form(None),
+    no_cache: bool = Form(False),
+    ai_review: bool = Form(False),
+):
+    """
+    Re-analyze an edited file, scoped to what changed. Send the new content
+    with `base_id` (a `version_id` from an earlier call), or a unified `diff`
+    plus either `base_id` or the new content. Line numbers in the result
+    refer to the new version; `changed` lists the affected line ranges.
+    """
+    lang = language.lower()
+    if lang not in ANALYZE_MAP:
+        return {"error": "Language " + language + " not supported yet."}
+
+    code = (await file.read()).decode("utf-8") if file is not None else None
+    base = None
+    if base_id:
+        base = await asyncio.to_thread(snapshots.get, base_id)
+        if base is None:
+            return {"error": "Unknown or expired base_id; send the full file instead."}
+
+    ranges = None
+    try:
+        if diff:
+            hunks = incremental.parse_unified_diff(diff)
+            if code is None:
+                if base is None:
+                    return {"error": "A diff needs either base_id or the new file content."}
+                code = incremental.apply_diff(base, hunks)
+            ranges = incremental.changed_ranges_from_hunks(hunks)
+        elif base is not None:
+            if code is None:
+                return {"error": "Send the new file content along with base_id."}
+            ranges = incremental.changed_ranges(base, code)
+    except incremental.DiffError as e:
+        return {"error": str(e)}
+    if code is None:
+        return {"error": "Send the file content, a diff, or both."}
+
+    version = await asyncio.to_thread(snapshots.put, lang, code)
+    if ranges is None:
+        result = await _analyze(lang, code, no_cache, ai_review)
+    elif not ranges:
+        result = {}
+    else:
+        result = await _scoped_analysis(lang, code, ranges, no_cache, ai_review)
+    return {
+        **result,
+        "analysis_id": version,
+        "version_id": version,
+        "base_id": base_id,
+        "changed": [list(r) for r in ranges] if ranges is not None else None,
+    }
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+async def _analyze_events(lang, code, no_cache, ai_review):
+    if not ai_review:
+        result = await _run("analyze", lang, code, no_cache)
+    else:
+        # The local analysis runs while the review streams.
+        local = asyncio.create_task(_run("analyze", lang, code, no_cache))
+        try:
+            metrics.set_language(lang)
+            key = make_key("review", lang, code, llm_batcher)
+            review = None if no_cache else await result_cache.get(key)
+            if review is None:
+                parts = []
+                async with admission.lane(lane_name(llm_batcher)).slot():
+                    async for text in ai_reviewer.stream_ai_reviewer(code, language=LANGUAGE_NAMES[lang]):
+                        parts.append(text)
+                        yield _sse("token", {"text": text})
+                review = {"ai_review": "".join(parts)}
+                if _cacheable(review):
+                    await result_cache.set(key, review)
+            result = _with_review(await local, review)
+        finally:
+            local.cancel()  # no-op when done; stops the work if the client went away
+
+    yield _sse("result", await _with_id(lang, code, result))
+    yield _sse("done", {})
+
+
+@router.post("/analyze/stream")
+async def analyze_code_stream(
+    language: str = Form(...),
+    file: UploadFile = File(...),
+    no_cache: bool = Form(False),
+    ai_review: bool = Form(False),
+):
+    """
+    Server-sent-events variant of /analyze: with `ai_review`, `token` events
+    carry the review text as it is generated; then one `result` event with
+    the full response.
+    """
+    content = await file.read()
+    code = content.decode("utf-8")
+
+    lang = language.lower()
+    if lang not in ANALYZE_MAP:
+        return {"error": "Language " + language + " not supported yet."}
+    _check_admission(lang, ai_review)
+
+    return StreamingResponse(
+        _analyze_events(lang, code, no_cache, ai_review),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.websocket("/live")
+async def live_analysis(websocket: WebSocket):
+    """
+    As-you-type linting over a WebSocket. Client messages:
+      {"type": "open", "language": "python", "text": "...", "version": 0}
+      {"type": "change", "version": 1, "changes": [LSP-style content changes]}
+    After each quiet period the server pushes {"type": "diagnostics",
+    "version", "lint", "complexity", "changed", "elapsed_ms"} for the latest
+    version only, or {"type": "error", ...}. Results go through the result
+    cache, so undoing back to an earlier state is answered from it.
+    """
+    await websocket.accept()
+    session = None
+
+    async def send(message):
+        await websocket.send_text(orjson.dumps(message).decode())
+
+    try:
+        while True:
+            try:
+                msg = orjson.loads(await websocket.receive_text())
+                kind = msg.get("type")
+                if kind == "open":
+                    lang = str(msg.get("language", "")).lower()
+                    if lang not in ANALYZE_MAP:
+                        raise live.EditError("Language " + str(msg.get("language")) + " not supported yet.")
+                    if session is not None:
+                        session.close()
+                        session = None
+
+                    async def analyze(code, lang=lang):
+                        # Linters need the whole file for context, so every run covers the buffer.
+                        return await _run("analyze", lang, code)
+
+                    opened = live.LiveSession(analyze, send)
+                    opened.open(str(msg.get("text", "")), msg.get("version", 0))
+                    session = opened
+                elif kind == "change":
+                    if session is None:
+                        raise live.EditError("Send an 'open' message first.")
+                    session.change(msg.get("changes") or [], msg.get("version"))
+                else:
+                    raise live.EditError(f"Unknown message type: {kind!r}")
+            except (orjson.JSONDecodeError, AttributeError):
+                await send({"type": "error", "error": "Messages must be JSON objects."})
+            except live.EditError as e:
+                await send({"type": "error", "error": str(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if session is not None:
+            session.close()
+
+
+async def _ndjson(records):
+    async for record in records:
+        yield orjson.dumps(record) + b"\n"
+
+
+@router.post("/analyze/batch")
+async def analyze_batch(file: UploadFile = File(...), no_cache: bool = Form(False)):
+    """
+    Analyze every source file in a zip/tar archive. Languages come from file
+    extensions; results stream back as NDJSON, one line per file as it
+    finishes, followed by a `summary` line.
+    """
+    data = await file.read()
+    try:
+        files, skipped = await asyncio.to_thread(batch.read_archive, data, file.filename)
+    except batch.ArchiveError as e:
+        return {"error": str(e)}
+
+    files = [f for f in files if f[1] in ANALYZE_MAP]
+
+    async def analyze(lang, code):
+        return await _run("analyze", lang, code, no_cache, priority=BATCH)
+
+    return StreamingResponse(
+        _ndjson(batch.analyze_files(files, skipped, analyze)),
+        media_type="application/x-ndjson",
+    )
 
 @router.post("/format")
-async def format_code(language: str = Form(...), file: UploadFile = File(...)):
+async def format_code(language: str = Form(...), file: UploadFile = File(...), no_cache: bool = Form(False)):
     content = await file.read()
     code = content.decode("utf-8")
 
@@ -37,24 +398,88 @@ async def format_code(language: str = Form(...), file: UploadFile = File(...)):
     if not tool:
         return {"error": "Language " + language + " not supported yet."}
 
-    return tool.format_code(code, language=lang)
+    return await _run("format_code", lang, code, no_cache)
 
-from fastapi.responses import FileResponse
-import time
-import os
+@router.get("/cache/stats")
+async def cache_stats():
+    return result_cache.stats()
 
-@router.post("/report")
-async def generate_report(language: str = Form(...), file: UploadFile = File(...)):
-    content = await file.read()
-    code = content.decode("utf-8")
+@router.get("/admission/stats")
+async def admission_stats():
+    """Per-lane in-flight, queued and rejected counts (also exported on /metrics)."""
+    return admission.stats()
+
+@router.post("/report", status_code=202)
+async def generate_report(
+    language: str = Form(...),
+    file: UploadFile = File(None),
+    analysis_id: str = Form(None),
+    ai_review: bool = Form(False),
+):
+    """
+    Queue a PDF report for an uploaded `file`, or for the source of an
+    earlier analysis by its `analysis_id` (no re-upload; the cached
+    analysis is reused). Returns a job ID; poll GET /report/{job_id}
+    (optionally with ?wait=seconds) and fetch the PDF from /download.
+    """
+    lang = language.lower()
+    tool = ANALYZE_MAP.get(lang)
+    if not tool:
+        return {"error": "Language " + language + " not supported yet."}
+
+    if analysis_id:
+        code = await asyncio.to_thread(snapshots.get, analysis_id)
+        # The ID covers the language too, so a mismatch is as good as unknown.
+        if code is None or version_id(lang, code) != analysis_id:
+            raise HTTPException(status_code=404, detail="Unknown or expired analysis_id; upload the file instead")
+    elif file is not None:
+        code = (await file.read()).decode("utf-8")
+    else:
+        return {"error": "Send the file or an analysis_id."}
+
+    async def analyze(lang, code):
+        return await _analyze(lang, code, ai_review=ai_review, priority=BATCH)
+
+    op = "report-v" + report_jobs.REPORT_FORMAT_VERSION
+    if ai_review:
+        # The PDF embeds the review, so a model or chunking change needs a new key too.
+        op += "-ai:" + fingerprint(llm_batcher)
+    key = make_key(op, lang, code, tool)
+    job = report_jobs.submit(key, lang, code, analyze, keep=_cacheable)
+    return {
+        **job.to_dict(),
+        "status_url": f"{router.prefix}/report/{job.id}",
+        "download_url": f"{router.prefix}/report/{job.id}/download",
+    }
+
+@router.get("/report/{job_id}")
+async def report_status(job_id: str, wait: float = Query(0, ge=0, le=60)):
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown report job")
+    await report_jobs.wait(job, wait)
+    return job.to_dict()
 
-    timestamp = time.strftime("%Y%m%d_%H%M%S")
-    report_path = os.path.join("backend", "reports", f"code_review_report_{language}_{timestamp}.pdf")
+@router.get("/report/{job_id}/download")
+async def download_report(job_id: str, request: Request):
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown report job")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Report is {job.status}")
 
-    reporter.create_pdf_report(language, code, report_path)
+    if not job.stored:
+        # Rendered from an incomplete analysis; the next request renders it again.
+        headers = {"Cache-Control": "no-store"}
+    else:
+        # Reports are immutable per key, so the key is a strong validator.
+        headers = {"ETag": report_store.etag(job.id), "Cache-Control": "private, max-age=86400"}
+        if request.headers.get("if-none-match") in (headers["ETag"], "*"):
+            return Response(status_code=304, headers=headers)
 
     return FileResponse(
-        path=report_path,
-        filename=f"code_review_report_{language}.pdf",
-        media_type="application/pdf"
+        path=job.path,
+        filename=f"code_review_report_{job.language or 'code'}.pdf",
+        media_type="application/pdf",
+        headers=headers,
     )
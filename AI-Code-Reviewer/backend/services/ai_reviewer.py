@@ -1,33 +1,285 @@
+import asyncio
+import json
 import os
-import requests
+import random
+import time
+import httpx
 from dotenv import load_dotenv
+from services.chunker import chunk_code, number_lines
+from utils import metrics, process_pool
 
 load_dotenv()
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+# Point at a local stub (see bench/stub_llm.py) for offline runs.
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
+MODEL = os.getenv("AI_MODEL", "openai/gpt-oss-20b")
+
+AI_CONNECT_TIMEOUT = float(os.getenv("AI_CONNECT_TIMEOUT", "5"))
+AI_READ_TIMEOUT = float(os.getenv("AI_READ_TIMEOUT", "90"))
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "3"))
+AI_BACKOFF_BASE = float(os.getenv("AI_BACKOFF_BASE", "0.5"))
+AI_BACKOFF_MAX = float(os.getenv("AI_BACKOFF_MAX", "8"))
+# Upper bound on LLM calls in flight from this worker (also the connection pool size).
+AI_CONCURRENCY = int(os.getenv("AI_CONCURRENCY", "8"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Prefixes of the messages returned/streamed instead of a review on failure.
+ERROR_PREFIXES = ("Error:", "AI Error:", "AI Review failed:")
+
+_client = None
+_semaphore = None
+
+
+class AIError(Exception):
+    pass
 
-def run_ai_reviewer(code: str, language: str = "java"):
-    if not OPENROUTER_API_KEY:
-        return "Error: OPENROUTER_API_KEY not set in .env"
 
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    headers = {
+def get_client():
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=OPENROUTER_BASE_URL,
+            timeout=httpx.Timeout(AI_READ_TIMEOUT, connect=AI_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=AI_CONCURRENCY,
+                max_keepalive_connections=AI_CONCURRENCY,
+                keepalive_expiry=60,
+            ),
+        )
+    return _client
+
+
+def _limiter():
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(AI_CONCURRENCY)
+    return _semaphore
+
+
+async def close():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _headers():
+    return {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
         "Content-Type": "application/json"
     }
 
-    data = {
-        "model": "openai/gpt-oss-20b",
-        "messages": [
-            {"role": "system", "content": "You are an expert software code reviewer."},
-            {"role": "user", "content": f"Please review this {language} code:\n\n{code}"}
-        ]
-    }
 
+def _messages(code, language):
+    return [
+        {"role": "system", "content": "You are an expert software code reviewer."},
+        {"role": "user", "content": f"Please review this {language} code:\n\n{code}"}
+    ]
+
+
+def _chunk_messages(text, language, first, last, total, focus=""):
+    numbered = number_lines(text, first)
+    return [
+        {"role": "system", "content": "You are an expert software code reviewer."},
+        {"role": "user", "content": (
+            f"Please review lines {first}-{last} of a {total}-line {language} file. "
+            "Each line is prefixed with its line number; refer to those numbers "
+            f"in your findings.{focus}\n\n{numbered}"
+        )},
+    ]
+
+
+def _backoff(attempt, response=None):
+    """Full-jitter exponential backoff, honouring a numeric Retry-After."""
+    if response is not None:
+        try:
+            return min(float(response.headers.get("retry-after", "")), AI_BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(AI_BACKOFF_MAX, AI_BACKOFF_BASE * (2 ** attempt)))
+
+
+async def chat(messages):
+    """POST a chat completion, retrying 429/5xx and transport errors. Returns the reply text."""
+    data = {"model": MODEL, "messages": messages}
+    queued = time.perf_counter()
+    async with _limiter():
+        metrics.record("llm_queue", time.perf_counter() - queued, MODEL)
+        for attempt in range(AI_MAX_RETRIES + 1):
+            last = attempt == AI_MAX_RETRIES
+            try:
+                with metrics.timed("llm", MODEL):
+                    response = await get_client().post("/chat/completions", headers=_headers(), json=data)
+            except httpx.TransportError:
+                if last:
+                    raise
+                with metrics.timed("llm_backoff", MODEL):
+                    await asyncio.sleep(_backoff(attempt))
+                continue
+
+            if response.status_code == 200:
+                return response.json()["choices"][0]["message"]["content"]
+            if response.status_code not in RETRY_STATUSES or last:
+                raise AIError(response.text)
+            with metrics.timed("llm_backoff", MODEL):
+                await asyncio.sleep(_backoff(attempt, response))
+
+
+async def stream_chat(messages):
+    """
+    Stream a chat completion (`stream: true`), yielding content deltas as they
+    arrive. Retries happen only before the first token has been yielded.
+    """
+    data = {"model": MODEL, "messages": messages, "stream": True}
+    queued = time.perf_counter()
+    async with _limiter():
+        started = time.perf_counter()
+        metrics.record("llm_queue", started - queued, MODEL)
+        first_token = False
+        try:
+            for attempt in range(AI_MAX_RETRIES + 1):
+                last = attempt == AI_MAX_RETRIES
+                try:
+                    async with get_client().stream("POST", "/chat/completions", headers=_headers(), json=data) as response:
+                        if response.status_code != 200:
+                            body = (await response.aread()).decode("utf-8", errors="replace")
+                            if response.status_code not in RETRY_STATUSES or last:
+                                raise AIError(body)
+                            await asyncio.sleep(_backoff(attempt, response))
+                            continue
+
+                        async for line in response.aiter_lines():
+                            # Blank lines separate events; ":" lines are keep-alive comments.
+                            if not line.startswith("data:"):
+                                continue
+                            payload = line[5:].strip()
+                            if payload == "[DONE]":
+                                return
+                            chunk = json.loads(payload)
+                            if "error" in chunk:
+                                raise AIError(json.dumps(chunk["error"]))
+                            choices = chunk.get("choices") or [{}]
+                            text = (choices[0].get("delta") or {}).get("content")
+                            if text:
+                                if not first_token:
+                                    first_token = True
+                                    metrics.record("llm_first_token", time.perf_counter() - started, MODEL)
+                                yield text
+                        return
+                except httpx.TransportError:
+                    # Once tokens have gone out a retry would repeat them.
+                    if last or first_token:
+                        raise
+                    await asyncio.sleep(_backoff(attempt))
+        finally:
+            metrics.record("llm", time.perf_counter() - started, MODEL)
+
+
+async def _review(messages):
     try:
-        response = requests.post(url, headers=headers, json=data)
-        if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"]
-        else:
-            return f"AI Error: {response.text}"
+        return await chat(messages)
+    except AIError as e:
+        return f"AI Error: {e}"
     except Exception as e:
         return f"AI Review failed: {str(e)}"
+
+
+async def run_ai_reviewer(code: str, language: str = "java"):
+    if not OPENROUTER_API_KEY:
+        return "Error: OPENROUTER_API_KEY not set in .env"
+    return await _review(_messages(code, language))
+
+
+async def _chunk_tasks(code, language):
+    """Start one review per chunk; the shared limiter caps how many run at once."""
+    # Parsing a large file for function boundaries is CPU work; keep it off the loop.
+    chunks = await process_pool.run(chunk_code, code, language)
+    if len(chunks) <= 1:
+        return chunks, []
+    total = len(code.splitlines())
+    tasks = [
+        asyncio.create_task(_review(_chunk_messages(text, language, first, last, total)))
+        for first, last, text in chunks
+    ]
+    return chunks, tasks
+
+
+def _section(first, last, review):
+    return f"### Lines {first}-{last}\n\n{review}"
+
+
+async def review_spans(code: str, language: str, spans, changed):
+    """
+    Review only `spans` (whole functions around an edit) of `code`, asking
+    the model to focus on the `changed` line ranges. Line numbers in the
+    prompt and in the result are those of the full file.
+    """
+    if not OPENROUTER_API_KEY:
+        return "Error: OPENROUTER_API_KEY not set in .env"
+    lines = code.splitlines(keepends=True)
+    total = len(lines)
+    focus = " These lines were just changed: " + ", ".join(
+        f"{a}-{b}" if a != b else str(a) for a, b in changed
+    ) + ". Review the changes and how they fit the surrounding function."
+    tasks = [
+        asyncio.create_task(_review(_chunk_messages("".join(lines[first - 1:last]), language, first, last, total, focus)))
+        for first, last in spans
+    ]
+    try:
+        reviews = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return "\n\n".join(_section(first, last, review) for (first, last), review in zip(spans, reviews))
+
+
+async def review_code(code: str, language: str = "java"):
+    """
+    Review a whole file. Files over the chunk budget are split at function
+    boundaries and the chunks are reviewed concurrently, so latency follows
+    the largest chunk rather than the file size.
+    """
+    if not OPENROUTER_API_KEY:
+        return "Error: OPENROUTER_API_KEY not set in .env"
+    chunks, tasks = await _chunk_tasks(code, language)
+    if not tasks:
+        return await run_ai_reviewer(code, language)
+    try:
+        reviews = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return "\n\n".join(_section(first, last, review) for (first, last, _), review in zip(chunks, reviews))
+
+
+def is_failed_review(text):
+    """True for an error message, including one appended after a partially streamed review."""
+    return text.startswith(ERROR_PREFIXES) or any(f"\n\n{p}" in text for p in ERROR_PREFIXES[1:])
+
+
+async def stream_ai_reviewer(code: str, language: str = "java"):
+    """Same as review_code, but yields the review text piece by piece."""
+    if not OPENROUTER_API_KEY:
+        yield "Error: OPENROUTER_API_KEY not set in .env"
+        return
+
+    chunks, tasks = await _chunk_tasks(code, language)
+    if tasks:
+        # Chunks are reviewed concurrently but emitted in file order.
+        try:
+            for i, ((first, last, _), task) in enumerate(zip(chunks, tasks)):
+                yield ("\n\n" if i else "") + _section(first, last, await task)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return
+
+    started = False
+    try:
+        async for text in stream_chat(_messages(code, language)):
+            started = True
+            yield text
+    except AIError as e:
+        yield ("\n\n" if started else "") + f"AI Error: {e}"
+    except Exception as e:
+        yield ("\n\n" if started else "") + f"AI Review failed: {str(e)}"
@@ -0,0 +1,178 @@
+import asyncio
+import io
+import os
+import posixpath
+import tarfile
+import time
+import zipfile
+import zlib
+from utils.common import parse_limits
+
+# File extension -> ANALYZE_MAP language key.
+EXTENSION_LANGS = {
+    ".py": "python",
+    ".js": "javascript",
+    ".mjs": "javascript",
+    ".cjs": "javascript",
+    ".ts": "typescript",
+    ".java": "java",
+    ".c": "c",
+    ".h": "c",
+    ".cc": "cpp",
+    ".cpp": "cpp",
+    ".cxx": "cpp",
+    ".hpp": "cpp",
+    ".go": "go",
+}
+
+SKIP_DIRS = {".git", ".hg", ".svn", "node_modules", "__pycache__", "venv", ".venv", "dist", "build"}
+
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "5000"))
+BATCH_MAX_FILE_BYTES = int(float(os.getenv("BATCH_MAX_FILE_KB", "512")) * 1024)
+BATCH_MAX_TOTAL_BYTES = int(float(os.getenv("BATCH_MAX_TOTAL_MB", "200")) * 1024 * 1024)
+
+DEFAULT_LOCAL_CONCURRENCY = os.cpu_count() or 2
+
+BATCH_CONCURRENCY = parse_limits(os.getenv("BATCH_CONCURRENCY", ""))
+
+
+class ArchiveError(Exception):
+    pass
+
+
+# What a truncated or corrupt archive raises while it is being read.
+_CORRUPT = (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError, zlib.error)
+
+
+def _skipped_dir(path):
+    return any(part in SKIP_DIRS for part in path.split("/")[:-1])
+
+
+def _iter_zip(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            yield info.filename, info.file_size, lambda info=info: zf.read(info)
+
+
+def _iter_tar(data):
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as tf:
+        for member in tf:
+            if not member.isfile():
+                continue
+            yield member.name, member.size, lambda member=member: tf.extractfile(member).read()
+
+
+def read_archive(data, filename=""):
+    """
+    Return (files, skipped): files is a list of (path, language, code) for every
+    analyzable source file in a zip or tar(.gz/.bz2/.xz) archive, skipped a list
+    of (path, reason).
+    """
+    if zipfile.is_zipfile(io.BytesIO(data)):
+        entries = _iter_zip(data)
+    else:
+        try:
+            tarfile.open(fileobj=io.BytesIO(data), mode="r:*").close()
+        except tarfile.TarError:
+            raise ArchiveError(f"{filename or 'upload'} is not a zip or tar archive")
+        entries = _iter_tar(data)
+
+    files, skipped = [], []
+    try:
+        _collect(entries, files, skipped)
+    except _CORRUPT as e:
+        # The listing itself broke (truncated tar, bad central directory).
+        raise ArchiveError(f"{filename or 'upload'} is damaged: {e}")
+    return files, skipped
+
+
+def _collect(entries, files, skipped):
+    total = 0
+    for raw_path, size, read in entries:
+        path = posixpath.normpath(raw_path.replace("\\", "/")).lstrip("/")
+        lang = EXTENSION_LANGS.get(posixpath.splitext(path)[1].lower())
+        if lang is None or _skipped_dir(path):
+            continue
+        if size > BATCH_MAX_FILE_BYTES:
+            skipped.append((path, "file too large"))
+            continue
+        if len(files) >= BATCH_MAX_FILES or total + size > BATCH_MAX_TOTAL_BYTES:
+            skipped.append((path, "archive limit reached"))
+            continue
+        try:
+            code = read().decode("utf-8")
+        except UnicodeDecodeError:
+            skipped.append((path, "not UTF-8 text"))
+            continue
+        except _CORRUPT as e:
+            skipped.append((path, f"unreadable: {e}"))
+            continue
+        total += size
+        files.append((path, lang, code))
+
+
+def _limit_for(lang):
+    return BATCH_CONCURRENCY.get(lang, DEFAULT_LOCAL_CONCURRENCY)
+
+
+def _issue_count(result):
+    lint = result.get("lint") if isinstance(result, dict) else None
+    return len(lint) if isinstance(lint, list) else 0
+
+
+async def analyze_files(files, skipped, analyze):
+    """
+    Fan `analyze(lang, code)` out over files with per-language concurrency
+    limits, yielding one record per file as it finishes, then a summary.
+    """
+    start = time.perf_counter()
+    semaphores = {}
+
+    for path, reason in skipped:
+        yield {"type": "skipped", "path": path, "reason": reason}
+
+    async def one(path, lang, code):
+        sem = semaphores.setdefault(lang, asyncio.Semaphore(_limit_for(lang)))
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                result = await analyze(lang, code)
+            except Exception as e:
+                result = {"error": f"{type(e).__name__}: {e}"}
+            return {
+                "type": "file",
+                "path": path,
+                "language": lang,
+                "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+                "result": result,
+            }
+
+    tasks = [asyncio.ensure_future(one(*f)) for f in files]
+    by_language = {}
+    errors = 0
+    try:
+        for fut in asyncio.as_completed(tasks):
+            record = await fut
+            stats = by_language.setdefault(record["language"], {"files": 0, "lint_issues": 0, "errors": 0})
+            stats["files"] += 1
+            stats["lint_issues"] += _issue_count(record["result"])
+            if "error" in record["result"]:
+                stats["errors"] += 1
+                errors += 1
+            yield record
+    finally:
+        # Client went away or we were cancelled: don't leave work running.
+        for t in tasks:
+            t.cancel()
+
+    yield {
+        "type": "summary",
+        "files": len(files),
+        "skipped": len(skipped),
+        "errors": errors,
+        "lint_issues": sum(s["lint_issues"] for s in by_language.values()),
+        "by_language": by_language,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
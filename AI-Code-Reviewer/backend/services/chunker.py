@@ -0,0 +1,119 @@
+import ast
+import os
+import lizard
+
+# Rough prompt budget per chunk, in tokens (estimated as characters / 4).
+AI_CHUNK_TOKENS = int(os.getenv("AI_CHUNK_TOKENS", "6000"))
+
+# lizard picks its parser from the file extension.
+LIZARD_EXTENSIONS = {
+    "java": ".java",
+    "go": ".go",
+    "javascript": ".js",
+    "js": ".js",
+    "typescript": ".ts",
+    "cpp": ".cpp",
+    "c++": ".cpp",
+    "c": ".c",
+}
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def _python_units(code):
+    """(start, end) line spans of top-level statements, decorators included."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    spans = []
+    for node in tree.body:
+        start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+        spans.append((start, node.end_lineno))
+    return spans
+
+
+def _lizard_units(code, language):
+    ext = LIZARD_EXTENSIONS.get(language.lower())
+    if not ext:
+        return []
+    info = lizard.analyze_file.analyze_source_code("code" + ext, code)
+    return [(f.start_line, f.end_line) for f in info.function_list]
+
+
+def split_units(code, language):
+    """
+    Cut `code` into consecutive line spans that never split a function:
+    every function (or Python top-level statement) is one span, and the
+    code between functions becomes spans of its own. Lines are 1-based.
+    """
+    total = len(code.splitlines())
+    if language.lower() == "python":
+        units = _python_units(code)
+    else:
+        units = _lizard_units(code, language)
+
+    spans, line = [], 1
+    for start, end in sorted(units):
+        # Nested functions (methods inside an already covered span) are skipped.
+        if end < line:
+            continue
+        start = max(start, line)
+        if start > line:
+            spans.append((line, start - 1))
+        spans.append((start, end))
+        line = end + 1
+    if line <= total:
+        spans.append((line, total))
+    return spans
+
+
+def chunk_code(code, language, budget=None):
+    """
+    Pack whole units into chunks of at most `budget` tokens.
+    Returns [(first_line, last_line, text)]. A single unit bigger than the
+    budget is cut on line boundaries as a last resort.
+    """
+    budget = budget or AI_CHUNK_TOKENS
+    lines = code.splitlines(keepends=True)
+    chunks = []
+    cur_start, cur_lines, cur_tokens = None, [], 0
+
+    def flush():
+        nonlocal cur_start, cur_lines, cur_tokens
+        if cur_lines:
+            chunks.append((cur_start, cur_start + len(cur_lines) - 1, "".join(cur_lines)))
+        cur_start, cur_lines, cur_tokens = None, [], 0
+
+    for start, end in split_units(code, language):
+        unit = lines[start - 1:end]
+        tokens = estimate_tokens("".join(unit))
+        if cur_lines and cur_tokens + tokens > budget:
+            flush()
+        if tokens > budget:
+            for offset, text in enumerate(unit):
+                cost = estimate_tokens(text)
+                if cur_lines and cur_tokens + cost > budget:
+                    flush()
+                if cur_start is None:
+                    cur_start = start + offset
+                cur_lines.append(text)
+                cur_tokens += cost
+            continue
+        if cur_start is None:
+            cur_start = start
+        cur_lines.extend(unit)
+        cur_tokens += tokens
+    flush()
+    return chunks
+
+
+def number_lines(text, first_line):
+    """Prefix each line with its line number in the original file."""
+    width = len(str(first_line + text.count("\n")))
+    return "".join(
+        f"{first_line + i:>{width}} | {line}"
+        for i, line in enumerate(text.splitlines(keepends=True))
+    )
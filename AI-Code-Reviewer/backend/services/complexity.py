@@ -0,0 +1,13 @@
+from services import cpp_engine
+from utils import process_pool
+from utils.sandbox import ResourceExceeded
+
+
+async def lizard(code, suffix):
+    """Per-function complexity rows from lizard; `suffix` picks its parser. Returns (rows, notes)."""
+    try:
+        return await process_pool.run(cpp_engine.complexity, code, suffix), []
+    except ResourceExceeded:
+        raise
+    except Exception as e:
+        return [], [f"Lizard error: {e or type(e).__name__}"]
@@ -0,0 +1,48 @@
+"""
+In-process C/C++ analyzers. These functions run inside the engine process
+pool (utils/process_pool.py), where cpplint and lizard are imported once
+per worker and read the source from memory instead of a spawned CLI.
+"""
+import cpplint
+import lizard
+from utils.results import function, issue
+
+# cpplint's name for stdin; keeps its filename-based checks the same as `cpplint -`.
+FILENAME = "-"
+
+
+def lint(code):
+    """cpplint findings as issue records (confidence >= 5 is a warning)."""
+    issues = []
+
+    def error(filename, linenum, category, confidence, message):
+        # Applies the default filters, verbosity and NOLINT comments, like cpplint.Error.
+        if cpplint._ShouldPrintError(category, confidence, filename, linenum):
+            severity = "warning" if confidence >= 5 else "info"
+            issues.append(issue(linenum, 1 if linenum else 0, category, message, severity))
+
+    lines = code.split("\n")
+    lf_lines, crlf_lines = [], []
+    for linenum in range(len(lines) - 1):
+        if lines[linenum].endswith("\r"):
+            lines[linenum] = lines[linenum].rstrip("\r")
+            crlf_lines.append(linenum + 1)
+        else:
+            lf_lines.append(linenum + 1)
+
+    cpplint.ProcessFileData(FILENAME, FILENAME, lines, error)
+    if lf_lines and crlf_lines:
+        for linenum in crlf_lines:
+            error(FILENAME, linenum, "whitespace/newline", 1, "Unexpected \\r (^M) found; better to use only \\n")
+    issues.sort(key=lambda i: i["line"])
+    return issues
+
+
+def complexity(code, suffix=".cpp"):
+    """lizard per-function rows; `suffix` picks the parser (.cpp, .go, .java, ...)."""
+    info = lizard.analyze_file.analyze_source_code("code" + suffix, code)
+    return [
+        function(f.name, f.start_line, f.end_line, f.cyclomatic_complexity,
+                 nloc=f.nloc, tokens=f.token_count, params=f.parameter_count)
+        for f in info.function_list
+    ]
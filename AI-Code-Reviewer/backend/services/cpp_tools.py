@@ -1,44 +1,57 @@
-import json
-from utils.common import run_cmd, which, tool_or_msg
-from utils.file_handler import save_code_to_tempfile
+import os
+from services import cpp_engine
+from services.complexity import lizard
+from utils import process_pool
+from utils.common import run_cmd, tool_or_msg
+from utils.sandbox import ResourceExceeded
+from utils.stages import run_stages
 
+TOOLS = ["cpplint", "lizard", "clang-format"]
 
-def analyze(code, language=None):
-    temp_path = save_code_to_tempfile(code, ".cpp")
+# Any -style value clang-format accepts: a preset name, "file", or "{...}".
+CLANG_FORMAT_STYLE = os.getenv("CLANG_FORMAT_STYLE", "Google")
 
-    cpplint_path, msg = tool_or_msg(
-        "cpplint",
-        "cpplint not found. Install with: pip install cpplint"
+
+async def _cpplint(code):
+    try:
+        return await process_pool.run(cpp_engine.lint, code), []
+    except ResourceExceeded:
+        raise
+    except Exception as e:
+        return [], [f"cpplint error: {e or type(e).__name__}"]
+
+
+async def _lizard(code):
+    return await lizard(code, ".cpp")
+
+
+STAGES = {"lint": _cpplint, "complexity": _lizard}
+TIMED_OUT = {"lint": ([], []), "complexity": ([], [])}
+
+
+async def analyze(code, language=None):
+    result = await run_stages(STAGES, code, placeholders=TIMED_OUT)
+    (issues, lint_notes), (rows, complexity_notes) = result["lint"], result["complexity"]
+    result.update(lint=issues, complexity=rows)
+    if lint_notes or complexity_notes:
+        result["notes"] = lint_notes + complexity_notes
+    return result
+
+
+async def format_code(code, language=None):
+    clang_format, msg = tool_or_msg(
+        "clang-format",
+        "clang-format not found. Install it (e.g. apt install clang-format) to format C/C++."
     )
-    lint_list = []
-    if not msg:
-        rc, out, err = run_cmd([cpplint_path, temp_path])
-        if err:
-            for line in err.splitlines():
-                lint_list.append(line.strip())
-    else:
-        lint_list.append(msg)
-
-    lizard_path, msg2 = tool_or_msg(
-        "lizard",
-        "lizard not found. Install with: pip install lizard"
+    if msg:
+        return {"original": code, "formatted": code, "note": msg}
+    # clang-format has no server mode, but it is a native binary that starts
+    # in milliseconds; the source goes over stdin, so no scratch file.
+    suffix = ".c" if language == "c" else ".cpp"
+    rc, out, err = await run_cmd(
+        [clang_format, f"-style={CLANG_FORMAT_STYLE}", f"--assume-filename=code{suffix}"],
+        input_text=code,
     )
-    complexity_summary = "N/A"
-    if not msg2:
-        rc, out, err = run_cmd([lizard_path, "-C", "10", temp_path])
-        if rc == 0:
-            complexity_summary = out.strip() or "No complexity issues"
-        else:
-            complexity_summary = "Lizard error: " + (err or "unknown error")
-    else:
-        complexity_summary = msg2
-
-    return {"lint": lint_list, "complexity": complexity_summary}
-
-
-def format_code(code, language=None):
-    return {
-        "original": code,
-        "formatted": code,
-        "note": "C++ formatting not implemented (consider clang-format)."
-    }
+    if rc != 0:
+        return {"original": code, "formatted": code, "note": "clang-format error: " + (err or "unknown error")}
+    return {"original": code, "formatted": out + "\n" if out else out}
@@ -1,16 +1,84 @@
-from utils.file_handler import save_code_to_tempfile
-from services.ai_reviewer import run_ai_reviewer
+import re
+from services.complexity import lizard
+from utils.common import run_cmd, tool_or_msg
+from utils.file_handler import workspace
+from utils.results import issue
+from utils.stages import run_stages
 
-def analyze(code, language="go"):
-    save_code_to_tempfile(code, ".go")
+TOOLS = ["go", "lizard"]
 
-    ai_review = run_ai_reviewer(code, language="Go")
-    return {"ai_review": ai_review}
+# "<standard input>:4:1: expected operand" (gofmt) and "vet: ./code.go:43:5: msg" (go vet).
+_GOFMT_RE = re.compile(r"^<standard input>:(\d+):(\d+): (.*)$")
+_VET_RE = re.compile(r"^(?:vet: )?\S*\.go:(\d+):(\d+): (.*)$")
 
 
-def format_code(code, language="go"):
-    ai_review = run_ai_reviewer(
-        f"Please reformat this Go code according to idiomatic Go style (gofmt/goimports):\n\n{code}",
-        language="Go"
-    )
-    return {"ai_review": ai_review}
+async def _gofmt(code):
+    """(formatted, issues, notes); syntax errors come back as issues."""
+    gofmt_path, msg = tool_or_msg("gofmt", "gofmt not found. Install Go: https://go.dev/dl/")
+    if msg:
+        return None, [], [msg]
+    # -e reports every syntax error instead of the first ten.
+    rc, out, err = await run_cmd([gofmt_path, "-e"], input_text=code)
+    if rc == 0:
+        return out + "\n" if out else out, [], []
+    issues = []
+    for line in err.splitlines():
+        m = _GOFMT_RE.match(line)
+        if m:
+            issues.append(issue(m.group(1), m.group(2), "syntax", m.group(3), "error"))
+    return None, issues, [] if issues else [err or "gofmt failed"]
+
+
+async def _vet(code):
+    go_path, msg = tool_or_msg("go", "go not found. Install Go: https://go.dev/dl/")
+    if msg:
+        return [], [msg]
+    # go vet type-checks a package, so the code needs to be a real .go file.
+    async with workspace.scratch_file(code, ".go") as temp_path:
+        rc, out, err = await run_cmd([go_path, "vet", temp_path])
+    issues = []
+    for line in err.splitlines():
+        m = _VET_RE.match(line)
+        if m:
+            # "vet: " marks type-check errors; the rest are vet analyzer findings.
+            severity = "error" if line.startswith("vet: ") else "warning"
+            issues.append(issue(m.group(1), m.group(2), "vet", m.group(3), severity))
+    return issues, []
+
+
+async def _lint(code):
+    formatted, issues, notes = await _gofmt(code)
+    if issues:
+        # vet would only repeat the syntax errors.
+        return issues, notes
+    vet_issues, vet_notes = await _vet(code)
+    if formatted is not None and formatted != code:
+        vet_issues.insert(0, issue(0, 0, "gofmt", "File is not gofmt-formatted.", "info"))
+    return vet_issues, notes + vet_notes
+
+
+async def _complexity(code):
+    return await lizard(code, ".go")
+
+
+STAGES = {"lint": _lint, "complexity": _complexity}
+TIMED_OUT = {"lint": ([], []), "complexity": ([], [])}
+
+
+async def analyze(code, language="go"):
+    result = await run_stages(STAGES, code, placeholders=TIMED_OUT)
+    (issues, lint_notes), (rows, complexity_notes) = result["lint"], result["complexity"]
+    result.update(lint=issues, complexity=rows)
+    if lint_notes or complexity_notes:
+        result["notes"] = lint_notes + complexity_notes
+    return result
+
+
+async def format_code(code, language="go"):
+    formatted, issues, notes = await _gofmt(code)
+    if formatted is None:
+        result = {"original": code, "formatted": code}
+        if issues or notes:
+            result["note"] = "; ".join(notes) or "gofmt: " + issues[0]["message"] + f" (line {issues[0]['line']})"
+        return result
+    return {"original": code, "formatted": formatted}
@@ -0,0 +1,141 @@
+import difflib
+import re
+from services.chunker import split_units
+
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class DiffError(Exception):
+    pass
+
+
+def parse_unified_diff(diff):
+    """
+    Parse a single-file unified diff into hunks:
+    [(old_start, old_len, new_start, new_len, lines)], where `lines` keep
+    their " ", "-" or "+" prefix. Each hunk body is read by the counts in
+    its header, so a "+++"/"---" inside it is content, not a file header.
+    File headers and other noise between hunks are ignored.
+    """
+    hunks = []
+    lines = diff.splitlines()
+    i = 0
+    while i < len(lines):
+        m = _HUNK_RE.match(lines[i])
+        i += 1
+        if not m:
+            continue
+        old_start, old_len, new_start, new_len = m.groups()
+        old_len = int(old_len) if old_len is not None else 1
+        new_len = int(new_len) if new_len is not None else 1
+        body, old_left, new_left = [], old_len, new_len
+        while old_left or new_left:
+            if i >= len(lines):
+                raise DiffError(f"Hunk at line {old_start} is truncated.")
+            line = lines[i]
+            i += 1
+            if line.startswith("\\"):
+                continue  # "\ No newline at end of file"
+            tag = line[:1] or " "  # some tools strip the space off empty context lines
+            if tag == " " and old_left and new_left:
+                old_left, new_left = old_left - 1, new_left - 1
+            elif tag == "-" and old_left:
+                old_left -= 1
+            elif tag == "+" and new_left:
+                new_left -= 1
+            else:
+                raise DiffError(f"Hunk at line {old_start} does not match its header.")
+            body.append(tag + line[1:])
+        hunks.append((int(old_start), old_len, int(new_start), new_len, body))
+    if not hunks:
+        raise DiffError("No hunks found in diff.")
+    return hunks
+
+
+def apply_diff(base, hunks):
+    """Apply parsed hunks to `base`, checking every context and removed line."""
+    old = base.splitlines()
+    new, pos = [], 0
+    for old_start, old_len, _, _, lines in hunks:
+        # A pure insertion's old_start is the line it goes after.
+        start = old_start if old_len == 0 else max(old_start - 1, 0)
+        if start < pos:
+            raise DiffError(f"Overlapping hunk at line {old_start}.")
+        new.extend(old[pos:start])
+        pos = start
+        for line in lines:
+            tag, text = line[0], line[1:]
+            if tag == "+":
+                new.append(text)
+                continue
+            if pos >= len(old) or old[pos] != text:
+                raise DiffError(f"Diff does not apply at base line {pos + 1}.")
+            if tag == " ":
+                new.append(text)
+            pos += 1
+    new.extend(old[pos:])
+    return "\n".join(new) + ("\n" if base.endswith("\n") or not base else "")
+
+
+def changed_ranges_from_hunks(hunks):
+    """New-file line ranges touched by the hunks; a pure deletion marks the line after it."""
+    ranges = []
+    for _, _, new_start, new_len, lines in hunks:
+        # A pure deletion's new_start is the line before it.
+        line, start = new_start + (new_len == 0), None
+        for entry in lines:
+            tag = entry[0]
+            if tag == "+":
+                start = line if start is None else start
+                line += 1
+                continue
+            if tag == "-":
+                start = line if start is None else start
+                continue
+            if start is not None:
+                ranges.append((start, max(start, line - 1)))
+                start = None
+            line += 1
+        if start is not None:
+            ranges.append((start, max(start, line - 1)))
+    return merge_ranges(ranges)
+
+
+def changed_ranges(base, new):
+    """Same as changed_ranges_from_hunks, computed from two full versions."""
+    matcher = difflib.SequenceMatcher(None, base.splitlines(), new.splitlines(), autojunk=False)
+    ranges = []
+    for tag, _, _, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            ranges.append((j1 + 1, max(j1 + 1, j2)))
+    return merge_ranges(ranges)
+
+
+def merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _touches(start, end, ranges):
+    return any(start <= r_end and r_start <= end for r_start, r_end in ranges)
+
+
+def touched_spans(code, language, ranges):
+    """Whole functions (or top-level blocks) that overlap a changed range."""
+    spans = [s for s in split_units(code, language) if _touches(s[0], s[1], ranges)]
+    return merge_ranges(spans)
+
+
+def scope_lint(lint, ranges):
+    """Keep issues on changed lines; file-level issues (line 0) are dropped."""
+    return [item for item in lint if _touches(item["line"], item["line"], ranges)]
+
+
+def scope_complexity(complexity, ranges):
+    """Keep rows for functions that overlap a changed range."""
+    return [row for row in complexity if _touches(row["line"], row["end_line"], ranges)]
@@ -1,15 +1,86 @@
-from utils.file_handler import save_code_to_tempfile
-from services.ai_reviewer import run_ai_reviewer
+import glob
+import os
+from services.complexity import lizard
+from utils.common import BACKEND_DIR, which
+from utils.results import issue, SEVERITIES
+from utils.stages import run_stages
+from utils.worker_pool import WorkerPool, WorkerError, ToolError
 
-def analyze(code, language="java"):
-    save_code_to_tempfile(code, ".java")
-    ai_review = run_ai_reviewer(code, language="Java")
-    return {"ai_review": ai_review}
+WORKER_SOURCE = os.path.join(BACKEND_DIR, "workers", "JavaWorker.java")
+# Drop google-java-format-<v>-all-deps.jar and checkstyle-<v>-all.jar in here.
+JAVA_TOOLS_DIR = os.getenv("JAVA_TOOLS_DIR", os.path.join(BACKEND_DIR, "tools", "java"))
 
+TOOLS = ["java", "lizard"]
+# The jar names carry the formatter/Checkstyle versions.
+CACHE_SALT = ",".join(sorted(os.path.basename(p) for p in glob.glob(os.path.join(JAVA_TOOLS_DIR, "*.jar"))))
 
-def format_code(code, language="java"):
-    ai_review = run_ai_reviewer(
-        f"Please reformat this Java code according to Google Java Style Guide:\n\n{code}",
-        language="Java"
-    )
-    return {"ai_review": ai_review}
+# Number of warm JVMs; 0 disables local Java formatting and linting.
+JAVA_WORKERS = int(os.getenv("JAVA_WORKERS", "1"))
+# google-java-format drives javac internals, which JDK 16+ only exposes on request.
+_JAVAC_EXPORTS = [
+    f"--add-exports=jdk.compiler/com.sun.tools.javac.{pkg}=ALL-UNNAMED"
+    for pkg in ("api", "code", "file", "parser", "tree", "util")
+]
+# The first request also pays for JVM start-up and compiling the worker source.
+pool = WorkerPool(
+    "java",
+    ["java", *_JAVAC_EXPORTS, "-cp", os.path.join(JAVA_TOOLS_DIR, "*"), WORKER_SOURCE],
+    size=JAVA_WORKERS, cwd=BACKEND_DIR, timeout=60,
+)
+
+UNAVAILABLE = (
+    "Java tools not available. Install a JDK (17+) and put the google-java-format "
+    f"(all-deps) and Checkstyle (all) jars in {JAVA_TOOLS_DIR}."
+)
+
+
+def pool_enabled():
+    return JAVA_WORKERS > 0 and which("java") is not None and bool(CACHE_SALT)
+
+
+async def _lint(code):
+    if not pool_enabled():
+        return [], [UNAVAILABLE]
+    try:
+        records = await pool.request("lint", code=code)
+    except ToolError as e:
+        return [], [f"Checkstyle failed: {e}"]
+    except WorkerError as e:
+        # No verdict on the code itself; None keeps the result out of the cache.
+        return None, [f"Checkstyle failed: {e}"]
+    issues = [
+        issue(r["line"], r["col"], r["code"], r["message"], r["severity"] if r["severity"] in SEVERITIES else "info")
+        for r in records
+    ]
+    return issues, []
+
+
+async def _complexity(code):
+    return await lizard(code, ".java")
+
+
+STAGES = {"lint": _lint, "complexity": _complexity}
+TIMED_OUT = {"lint": ([], []), "complexity": ([], [])}
+
+
+async def analyze(code, language="java"):
+    result = await run_stages(STAGES, code, placeholders=TIMED_OUT)
+    (issues, lint_notes), (rows, complexity_notes) = result["lint"], result["complexity"]
+    if issues is None:
+        result["partial"] = True
+    result.update(lint=issues or [], complexity=rows)
+    if lint_notes or complexity_notes:
+        result["notes"] = lint_notes + complexity_notes
+    return result
+
+
+async def format_code(code, language="java"):
+    if not pool_enabled():
+        return {"original": code, "formatted": code, "note": UNAVAILABLE}
+    try:
+        formatted = await pool.request("format", code=code)
+    except ToolError as e:
+        return {"original": code, "formatted": code, "note": f"google-java-format: {e}"}
+    except WorkerError as e:
+        return {"original": code, "formatted": code, "note": f"google-java-format: {e}", "partial": True}
+    return {"original": code, "formatted": formatted}
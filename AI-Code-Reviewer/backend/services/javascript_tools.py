@@ -1,12 +1,56 @@
 import json
+import os
+from utils import metrics
 from utils.common import run_cmd, which, tool_or_msg
+from utils.results import issue
+from utils.worker_pool import WorkerPool, WorkerError, ToolError
 
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKER_SCRIPT = os.path.join(BACKEND_DIR, "workers", "js_worker.mjs")
 
-def analyze(code, language=None):
+TOOLS = ["eslint", "prettier"]
+CONFIG_FILES = ["eslint.config.mjs"]
+
+# Number of warm Node workers; 0 disables the pool and spawns the CLIs per request.
+JS_WORKERS = int(os.getenv("JS_WORKERS", "2"))
+
+pool = WorkerPool("js", ["node", WORKER_SCRIPT], size=JS_WORKERS, cwd=BACKEND_DIR)
+
+
+def pool_enabled():
+    return JS_WORKERS > 0 and which("node") is not None
+
+
+def _parse_eslint(data):
+    lint_list = []
+    for file_res in data:
+        for m in file_res.get("messages", []):
+            # Parse errors come back as fatal messages without a rule.
+            severity = "error" if m.get("fatal") or m.get("severity") == 2 else "warning"
+            lint_list.append(issue(
+                m.get("line") or 1,
+                m.get("column") or 1,
+                m.get("ruleId") or "parse-error",
+                m.get("message") or "",
+                severity,
+            ))
+    return lint_list
+
+
+async def analyze(code, language=None):
     """
     Analyze JavaScript/TypeScript code using ESLint via stdin.
     Avoids 'outside of base path' issues with temp files.
     """
+    if pool_enabled():
+        try:
+            data = await pool.request("lint", code=code, language=language)
+            return {"lint": _parse_eslint(data), "complexity": []}
+        except ToolError as e:
+            return {"lint": [], "complexity": [], "notes": [f"ESLint error: {e}"]}
+        except WorkerError:
+            pass  # pool unavailable; fall back to a one-off CLI run below
+
     ext = ".ts" if language == "typescript" else ".js"
 
     eslint_path, msg = tool_or_msg(
@@ -14,40 +58,47 @@ def analyze(code, language=None):
         "ESLint not found on PATH. Install Node + ESLint (npm install -D eslint)."
     )
     if msg:
-        return {"lint": [msg], "complexity": "N/A"}
+        return {"lint": [], "complexity": [], "notes": [msg]}
 
-    code_rc, out, err = run_cmd([
+    code_rc, out, err = await run_cmd([
         eslint_path,
         "-c", "eslint.config.mjs",
         "-f", "json",
         "--stdin",
-        "--stdin-filename", f"dummy{ext}" 
+        "--stdin-filename", f"dummy{ext}"
     ], input_text=code)
 
-    lint_list = []
+    lint_list, notes = [], []
     if out:
         try:
-            data = json.loads(out)
-            for file_res in data:
-                for m in file_res.get("messages", []):
-                    rule = m.get("ruleId") or "rule"
-                    line = str(m.get("line") or 1)
-                    col = str(m.get("column") or 1)
-                    txt = m.get("message") or ""
-                    lint_list.append(f"{line}:{col}: {rule} {txt}")
+            with metrics.timed("parse", "eslint"):
+                lint_list = _parse_eslint(json.loads(out))
         except Exception as e:
-            lint_list.append("ESLint parse error: " + str(e))
+            notes.append("ESLint parse error: " + str(e))
     elif err:
-        lint_list.append("ESLint error: " + err)
+        notes.append("ESLint error: " + err)
 
-    complexity_summary = "ESLint run completed"
-    return {"lint": lint_list, "complexity": complexity_summary}
+    result = {"lint": lint_list, "complexity": []}
+    if notes:
+        result["notes"] = notes
+        # ESLint produced no report, so an empty lint list says nothing about the code.
+        result["partial"] = True
+    return result
 
 
-def format_code(code, language=None):
+async def format_code(code, language=None):
     """
     Format JavaScript/TypeScript code using Prettier.
     """
+    if pool_enabled():
+        try:
+            formatted = await pool.request("format", code=code, language=language)
+            return {"original": code, "formatted": formatted}
+        except ToolError as e:
+            return {"original": code, "formatted": code, "note": f"Prettier failed: {e}"}
+        except WorkerError:
+            pass
+
     prettier_path = which("prettier")
     if not prettier_path:
         return {
@@ -58,7 +109,7 @@ def format_code(code, language=None):
 
     parser = "typescript" if language == "typescript" else "babel"
 
-    rc, out, err = run_cmd(
+    rc, out, err = await run_cmd(
         [prettier_path, "--parser", parser],
         input_text=code
     )
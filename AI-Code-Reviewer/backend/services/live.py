@@ -0,0 +1,146 @@
+import asyncio
+import os
+import time
+from services.incremental import merge_ranges
+
+# Quiet period after the last edit before re-analyzing, milliseconds.
+LIVE_DEBOUNCE_MS = float(os.getenv("LIVE_DEBOUNCE_MS", "150"))
+LIVE_MAX_BYTES = int(float(os.getenv("LIVE_MAX_KB", "512")) * 1024)
+
+
+class EditError(Exception):
+    pass
+
+
+def _offset(text, line_starts, pos):
+    try:
+        line, character = int(pos["line"]), int(pos["character"])
+    except (KeyError, TypeError, ValueError):
+        raise EditError("Positions need integer 'line' and 'character'.")
+    if line < 0 or character < 0:
+        raise EditError("Positions must not be negative.")
+    if line >= len(line_starts):
+        return len(text)
+    start = line_starts[line]
+    end = line_starts[line + 1] - 1 if line + 1 < len(line_starts) else len(text)
+    return min(start + character, end)
+
+
+def _shift(ranges, first, last, new_last):
+    """Move pending 1-based ranges after an edit replaced lines first..last with first..new_last."""
+    delta = new_last - last
+    shifted = [(first, new_last)]
+    for a, b in ranges:
+        if b < first:
+            shifted.append((a, b))
+        elif a > last:
+            shifted.append((a + delta, b + delta))
+        else:
+            shifted.append((min(a, first), max(b + delta, new_last)))
+    return merge_ranges(shifted)
+
+
+def apply_edits(text, edits, changed=()):
+    """
+    Apply LSP-style content changes in order: {"range": {"start": {"line",
+    "character"}, "end": {...}}, "text": "..."} with 0-based positions
+    (characters are code points), or just {"text": ...} to replace
+    everything. Returns (new_text, changed) where `changed` are 1-based
+    line ranges of the new text (None once the whole text was replaced).
+    """
+    changed = list(changed) if changed is not None else None
+    for edit in edits:
+        if not isinstance(edit, dict) or not isinstance(edit.get("text"), str):
+            raise EditError("Each change needs a 'text' string.")
+        rng = edit.get("range")
+        if rng is None:
+            text, changed = edit["text"], None
+            continue
+        if not isinstance(rng, dict):
+            raise EditError("'range' must be an object with 'start' and 'end'.")
+        line_starts = [0]
+        line_starts.extend(i + 1 for i, ch in enumerate(text) if ch == "\n")
+        start = _offset(text, line_starts, rng.get("start"))
+        end = _offset(text, line_starts, rng.get("end"))
+        if end < start:
+            raise EditError("Range end is before its start.")
+        first = text.count("\n", 0, start) + 1
+        last = first + text.count("\n", start, end)
+        text = text[:start] + edit["text"] + text[end:]
+        if changed is not None:
+            changed = _shift(changed, first, last, first + edit["text"].count("\n"))
+    return text, changed
+
+
+def _check_size(text):
+    if len(text.encode("utf-8")) > LIVE_MAX_BYTES:
+        raise EditError(f"Buffer exceeds the {LIVE_MAX_BYTES // 1024} KB live-analysis limit.")
+
+
+class LiveSession:
+    """
+    One editor buffer. Edits are applied as they arrive; analysis runs once
+    the buffer has been quiet for `debounce` seconds, and a newer edit
+    cancels both a pending and a running analysis, so only the latest
+    version is ever reported.
+    """
+
+    def __init__(self, analyze, send, debounce=LIVE_DEBOUNCE_MS / 1000):
+        self.analyze = analyze
+        self.send = send
+        self.debounce = debounce
+        self.text = ""
+        self.version = 0
+        self.changed = None
+        self._task = None
+
+    def open(self, text, version=0):
+        _check_size(text)
+        self.text, self.version, self.changed = text, version, None
+        self._schedule(0)
+
+    def change(self, edits, version=None):
+        text, changed = apply_edits(self.text, edits, self.changed)
+        _check_size(text)
+        self.text, self.changed = text, changed
+        self.version = version if version is not None else self.version + 1
+        self._schedule(self.debounce)
+
+    def _schedule(self, delay):
+        if self._task is not None:
+            self._task.cancel()
+        changed = list(self.changed) if self.changed is not None else None
+        self._task = asyncio.create_task(self._run(delay, self.version, self.text, changed))
+
+    async def _run(self, delay, version, text, changed):
+        if delay:
+            await asyncio.sleep(delay)
+        start = time.perf_counter()
+        try:
+            result = await self.analyze(text)
+        except Exception as e:
+            await self._send({"type": "error", "version": version, "error": str(e),
+                              "retry_after": getattr(e, "retry_after", None)})
+            return
+        if version != self.version:
+            return  # superseded while the send was being prepared
+        self.changed = []  # reported; later edits start a new set of ranges
+        await self._send({
+            "type": "diagnostics",
+            "version": version,
+            **result,
+            "changed": [list(r) for r in changed] if changed is not None else None,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        })
+
+    async def _send(self, message):
+        try:
+            await self.send(message)
+        except Exception:
+            # The socket closed under a running analysis; the receive loop
+            # sees the disconnect and closes the session.
+            pass
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
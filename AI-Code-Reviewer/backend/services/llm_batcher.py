@@ -0,0 +1,162 @@
+import asyncio
+import os
+import re
+from services import ai_reviewer
+from services.chunker import estimate_tokens, AI_CHUNK_TOKENS
+
+CACHE_SALT = f"{ai_reviewer.MODEL}:{AI_CHUNK_TOKENS}"
+# Admission lane for every LLM review, whatever the language.
+LANE = "llm"
+
+# Off by default: batching trades a few milliseconds of latency per review
+# for fewer round trips under provider rate limits.
+AI_BATCH = os.getenv("AI_BATCH", "0") == "1"
+AI_BATCH_WINDOW_MS = float(os.getenv("AI_BATCH_WINDOW_MS", "25"))
+AI_BATCH_MAX_ITEMS = int(os.getenv("AI_BATCH_MAX_ITEMS", "8"))
+AI_BATCH_MAX_TOKENS = int(os.getenv("AI_BATCH_MAX_TOKENS", "6000"))
+# Snippets bigger than this are reviewed on their own (and chunked if needed).
+AI_BATCH_ITEM_MAX_TOKENS = int(os.getenv("AI_BATCH_ITEM_MAX_TOKENS", "1500"))
+
+_MARKER_RE = re.compile(r"^=== ITEM (\d+) ===[ \t]*$", re.MULTILINE)
+
+
+def _batch_messages(items):
+    parts = [
+        f"Review each of the following {len(items)} code snippets independently; "
+        "they are unrelated submissions. Answer with one section per snippet, "
+        "in order, each starting with its marker line exactly as given "
+        "(for example `=== ITEM 1 ===`) and nothing before the first marker."
+    ]
+    for n, (code, language, _) in enumerate(items, 1):
+        parts.append(f"=== ITEM {n} ===\nLanguage: {language}\n```\n{code}\n```")
+    return [
+        {"role": "system", "content": "You are an expert software code reviewer."},
+        {"role": "user", "content": "\n\n".join(parts)},
+    ]
+
+
+def split_reply(reply, count):
+    """Map item number -> review text; items the model skipped are missing."""
+    sections = {}
+    matches = list(_MARKER_RE.finditer(reply))
+    for i, m in enumerate(matches):
+        n = int(m.group(1))
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(reply)
+        text = reply[m.end():end].strip()
+        if 1 <= n <= count and text and n not in sections:
+            sections[n] = text
+    return sections
+
+
+class Batcher:
+    """
+    Collects review requests for up to `window` seconds and sends them as one
+    multi-item prompt, bounded by `max_items` and `max_tokens`. Each caller
+    gets its own section of the reply; anything the model fails to answer
+    is retried as a normal single review.
+    """
+
+    def __init__(self, window, max_items, max_tokens):
+        self.window = window
+        self.max_items = max_items
+        self.max_tokens = max_tokens
+        self._pending = []
+        self._tokens = 0
+        self._timer = None
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+
+    async def review(self, code, language):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        cost = estimate_tokens(code)
+        if self._pending and self._tokens + cost > self.max_tokens:
+            self._flush()
+        self._pending.append((code, language, future))
+        self._tokens += cost
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._tokens = self._pending, [], 0
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            if len(batch) == 1:
+                code, language, future = batch[0]
+                _resolve(future, await ai_reviewer.run_ai_reviewer(code, language))
+                return
+
+            try:
+                reply = await ai_reviewer.chat(_batch_messages(batch))
+            except ai_reviewer.AIError as e:
+                reply, error = "", f"AI Error: {e}"
+            except Exception as e:
+                reply, error = "", f"AI Review failed: {str(e)}"
+            else:
+                error = None
+            if error:
+                for _, _, future in batch:
+                    _resolve(future, error)
+                return
+
+            sections = split_reply(reply, len(batch))
+            retry = []
+            for n, (code, language, future) in enumerate(batch, 1):
+                if n in sections:
+                    _resolve(future, sections[n])
+                else:
+                    retry.append((code, language, future))
+
+            async def single(code, language, future):
+                _resolve(future, await ai_reviewer.run_ai_reviewer(code, language))
+
+            await asyncio.gather(*(single(*item) for item in retry))
+        finally:
+            # Cancelled mid-flight (shutdown): don't leave callers waiting forever.
+            for _, _, future in batch:
+                if not future.done():
+                    future.cancel()
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for task in self._tasks:
+            task.cancel()
+        for _, _, future in self._pending:
+            future.cancel()
+        self._pending = []
+
+
+def _resolve(future, text):
+    # The caller may have gone away (request cancelled) while the batch ran.
+    if not future.done():
+        future.set_result(text)
+
+
+batcher = Batcher(AI_BATCH_WINDOW_MS / 1000, AI_BATCH_MAX_ITEMS, AI_BATCH_MAX_TOKENS)
+
+
+async def review(code: str, language: str = "java"):
+    """review_code, but small snippets share a prompt with concurrent ones when AI_BATCH=1."""
+    if (
+        not AI_BATCH
+        or not ai_reviewer.OPENROUTER_API_KEY
+        or estimate_tokens(code) > AI_BATCH_ITEM_MAX_TOKENS
+    ):
+        return await ai_reviewer.review_code(code, language)
+    return await batcher.review(code, language)
@@ -0,0 +1,132 @@
+"""
+In-process Python analyzers. These functions run inside the engine process
+pool (utils/process_pool.py), where pycodestyle, pyflakes, radon and black
+are imported once per worker instead of once per request.
+"""
+import ast
+import io
+import re
+import tokenize
+
+import black
+import pycodestyle
+import pyflakes.checker
+from flake8.defaults import NOQA_FILE, NOQA_INLINE_REGEXP
+from flake8.plugins.pyflakes import FLAKE8_PYFLAKES_CODES
+from radon.complexity import cc_rank, cc_visit, sorted_results
+from utils.results import flake8_severity, function, issue
+
+FILENAME = "code.py"
+
+# flake8 runs pycodestyle with its own `# noqa` handling switched off and
+# applies flake8's rules afterwards (_apply_noqa); do the same.
+pycodestyle.noqa = lambda line: False
+
+_style = pycodestyle.StyleGuide(parse_argv=False, config_file=False, quiet=True)
+
+
+class _CollectReport(pycodestyle.BaseReport):
+    def __init__(self, options):
+        super().__init__(options)
+        self.results = []
+
+    def error(self, line_number, offset, text, check):
+        code = super().error(line_number, offset, text, check)
+        if code:
+            self.results.append((line_number, offset + 1, code, text[len(code):].strip()))
+        return code
+
+
+def _noqa_lines(lines):
+    """
+    Line number -> text searched for `# noqa`, as flake8 does it: every
+    line of a multi-line statement sees the comments of the whole statement.
+    """
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO("".join(lines)).readline))
+    except (tokenize.TokenError, SyntaxError):
+        return {}
+    mapping = {}
+    first, last = None, None
+    for tok in tokens:
+        if tok.type in (tokenize.ENDMARKER, tokenize.DEDENT):
+            continue
+        first = tok.start[0] if first is None else min(first, tok.start[0])
+        last = tok.end[0] if last is None else max(last, tok.end[0])
+        if tok.type in (tokenize.NL, tokenize.NEWLINE):
+            joined = "".join(lines[first - 1:last])
+            mapping.update(dict.fromkeys(range(first, last + 1), joined))
+            first, last = None, None
+    return mapping
+
+
+def _suppressed(code, noqa_lines, row):
+    # Like flake8, lines outside the token map (a file that does not tokenize) are never silenced.
+    match = NOQA_INLINE_REGEXP.search(noqa_lines.get(row, ""))
+    if match is None:
+        return False
+    codes = match.group("codes")
+    if codes is None:
+        return True
+    codes = tuple(c for c in re.split(r"[,\s]+", codes) if c)
+    return code in codes or code.startswith(codes)
+
+
+def _apply_noqa(code, issues):
+    """Drop findings silenced by `# noqa[: CODES]`, or all of them under `# flake8: noqa`."""
+    lines = code.splitlines(True)
+    if any(NOQA_FILE.match(line) for line in lines):
+        return []
+    if "noqa" not in code.lower():
+        return issues
+    noqa_lines = _noqa_lines(lines)
+    return [i for i in issues if not _suppressed(i[2], noqa_lines, i[0])]
+
+
+def lint(code):
+    """flake8-equivalent findings (pycodestyle + pyflakes) as issue records."""
+    issues = []
+
+    try:
+        tree = ast.parse(code, filename=FILENAME)
+    except SyntaxError as e:
+        found = [(e.lineno or 1, e.offset or 1, "E999", f"SyntaxError: {e.msg}")]
+        return [issue(row, col, c, text, "error") for row, col, c, text in _apply_noqa(code, found)]
+
+    checker = pyflakes.checker.Checker(tree, filename=FILENAME)
+    for m in checker.messages:
+        flake_code = FLAKE8_PYFLAKES_CODES.get(type(m).__name__, "F999")
+        issues.append((m.lineno, m.col + 1, flake_code, m.message % m.message_args))
+
+    report = _CollectReport(_style.options)
+    pycodestyle.Checker(
+        FILENAME, lines=code.splitlines(True), options=_style.options, report=report
+    ).check_all()
+    issues.extend(report.results)
+
+    issues = _apply_noqa(code, issues)
+    issues.sort(key=lambda i: (i[0], i[1]))
+    return [issue(row, col, c, text, flake8_severity(c)) for row, col, c, text in issues]
+
+
+def complexity(code):
+    """radon cyclomatic complexity, one row per function, method and class."""
+    try:
+        blocks = sorted_results(cc_visit(code))
+    except SyntaxError:
+        return []  # lint() already reports it as E999
+    rows = []
+    for b in blocks:
+        classname = getattr(b, "classname", None)
+        name = f"{classname}.{b.name}" if classname else b.name
+        kind = "class" if not hasattr(b, "is_method") else ("method" if b.is_method else "function")
+        rows.append(function(name, b.lineno, b.endline, b.complexity, rank=cc_rank(b.complexity), type=kind))
+    return rows
+
+
+def format_source(code):
+    try:
+        return black.format_str(code, mode=black.Mode())
+    except Exception:
+        # black leaves files it cannot parse untouched; do the same.
+        return code
@@ -1,32 +1,32 @@
-import subprocess
-import tempfile
-
-def analyze(code, language=None):
-    with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as temp1:
-        temp1.write(code.encode("utf-8"))
-        temp1.flush()
-        flake = subprocess.run(
-            ["flake8", temp1.name, "--format=%(row)d:%(col)d: %(code)s %(text)s"],
-            capture_output=True, text=True
-        )
-        lint_issues = flake.stdout.strip().split("\n") if flake.stdout else []
-
-    with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as temp2:
-        temp2.write(code.encode("utf-8"))
-        temp2.flush()
-        r = subprocess.run(
-            ["radon", "cc", temp2.name, "-j"],
-            capture_output=True, text=True
-        )
-        complexity = r.stdout.strip()
-
-    return {"lint": lint_issues, "complexity": complexity}
-
-def format_code(code, language=None):
-    with tempfile.NamedTemporaryFile(suffix=".py", delete=False, mode="w+") as temp:
-        temp.write(code)
-        temp.flush()
-        subprocess.run(["black", temp.name], capture_output=True, text=True)
-        temp.seek(0)
-        formatted = temp.read()
+from services import python_engine
+from utils import process_pool
+from utils.sandbox import ResourceExceeded
+from utils.stages import run_stages
+
+# Packages whose versions invalidate cached results (see utils.cache.fingerprint).
+TOOLS = ["flake8", "pycodestyle", "pyflakes", "radon", "black"]
+# Bumped when python_engine's output changes with the same tool versions.
+CACHE_SALT = "noqa"
+
+
+async def _lint(code):
+    return await process_pool.run(python_engine.lint, code)
+
+
+async def _complexity(code):
+    return await process_pool.run(python_engine.complexity, code)
+
+
+STAGES = {"lint": _lint, "complexity": _complexity}
+TIMED_OUT = {"lint": [], "complexity": []}
+
+
+async def analyze(code, language=None):
+    return await run_stages(STAGES, code, placeholders=TIMED_OUT)
+
+async def format_code(code, language=None):
+    try:
+        formatted = await process_pool.run(python_engine.format_source, code)
+    except ResourceExceeded as e:
+        return {"original": code, "formatted": code, "note": str(e), "resource_exceeded": [e.to_dict()]}
     return {"original": code, "formatted": formatted}
@@ -0,0 +1,178 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from services import reporter
+from services.report_store import store
+from utils import metrics
+
+# PDF rendering is CPU-bound reportlab work; keep it off the event loop and
+# away from the analyzer pool.
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+# Finished jobs are forgotten after this many seconds; their PDFs stay in the store.
+REPORT_JOB_TTL = float(os.getenv("REPORT_JOB_TTL", "3600"))
+# Part of every report key; bump it when the PDF layout changes.
+REPORT_FORMAT_VERSION = "3"
+
+_pool = None
+_jobs = {}
+
+
+class Job:
+    """A report render. Its ID is the report's content key in the store."""
+
+    def __init__(self, key, language):
+        self.id = key
+        self.language = language
+        self.status = "queued"
+        self.path = None
+        # False for a PDF served from its temp file and never committed.
+        self.stored = True
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.done = asyncio.Event()
+        self.task = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "language": self.language,
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+
+def _init_worker():
+    import services.reporter  # noqa: F401
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # Not forkserver: that server is shared with the engine pool, which
+        # starts it first with its own preload list. Spawned workers import
+        # reportlab once, in the initializer, and then stay up.
+        _pool = ProcessPoolExecutor(
+            max_workers=REPORT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+    return _pool
+
+
+def _reset_pool(broken=None):
+    """Drop the render pool (only if it is still `broken`, when given)."""
+    global _pool
+    if _pool is not None and (broken is None or _pool is broken):
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _expire():
+    cutoff = time.time() - REPORT_JOB_TTL
+    for job_id, job in list(_jobs.items()):
+        if job.finished and job.finished < cutoff:
+            del _jobs[job_id]
+            if not job.stored:
+                store.discard(job.path)
+
+
+def _finished(key, language, path):
+    job = Job(key, language)
+    job.status = "done"
+    job.path = path
+    job.finished = time.time()
+    job.done.set()
+    return job
+
+
+async def _run(job, code, analyze, keep):
+    job.status = "running"
+    tmp = store.temp_path(job.id)
+    pool = None
+    try:
+        analysis = await analyze(job.language, code)
+        if isinstance(analysis, dict) and "error" in analysis:
+            job.status = "failed"
+            job.error = analysis["error"]
+            return
+        loop = asyncio.get_running_loop()
+        with metrics.timed("render", "reportlab"):
+            pool = _get_pool()
+            await loop.run_in_executor(
+                pool, reporter.create_pdf_report, job.language, code, tmp, analysis
+            )
+        if keep is None or keep(analysis):
+            job.path = store.commit(job.id, tmp)
+        else:
+            job.path, job.stored = tmp, False
+        job.status = "done"
+        await asyncio.to_thread(store.sweep)
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            # A render worker died (e.g. OOM); start a fresh pool for later reports.
+            _reset_pool(pool)
+        store.discard(tmp)
+        job.status = "failed"
+        job.error = f"{type(e).__name__}: {e}"
+    finally:
+        job.finished = time.time()
+        job.done.set()
+
+
+def submit(key, language, code, analyze, keep=None):
+    """
+    Return the job for report `key`, starting one only if the PDF is neither
+    stored nor already being rendered. `analyze(language, code)` supplies the
+    analysis to embed, normally the cached /api/analyze path. When
+    `keep(analysis)` is false (a partial analysis, a failed AI review) the
+    PDF is served to this job only and rendered again on the next request.
+    """
+    _expire()
+    job = _jobs.get(key)
+    if job is not None and job.status in ("queued", "running"):
+        return job
+    if job is not None and not job.stored:
+        store.discard(job.path)
+
+    path = store.lookup(key)
+    if path:
+        job = _jobs[key] = _finished(key, language, path)
+        return job
+
+    job = _jobs[key] = Job(key, language)
+    job.task = asyncio.create_task(_run(job, code, analyze, keep))
+    return job
+
+
+def get(job_id):
+    job = _jobs.get(job_id)
+    if job is not None and (job.status != "done" or not job.stored):
+        return job
+    # Forgotten job or evicted file: the store is the source of truth.
+    path = store.lookup(job_id)
+    if not path:
+        return None
+    return job or _finished(job_id, None, path)
+
+
+async def wait(job, timeout):
+    """Long-poll helper: wait up to `timeout` seconds for the job to finish."""
+    if timeout > 0 and not job.done.is_set():
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    return job
+
+
+def shutdown():
+    for job in _jobs.values():
+        if job.task and not job.task.done():
+            job.task.cancel()
+    _reset_pool()
@@ -0,0 +1,90 @@
+import os
+import re
+import time
+import uuid
+from services import reporter
+
+REPORT_STORE_DIR = os.getenv("REPORT_STORE_DIR", os.path.join(reporter.REPORTS_DIR, "store"))
+REPORT_STORE_MAX_BYTES = int(float(os.getenv("REPORT_STORE_MAX_MB", "500")) * 1024 * 1024)
+REPORT_STORE_MAX_AGE = float(os.getenv("REPORT_STORE_MAX_AGE_DAYS", "7")) * 86400
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ReportStore:
+    """
+    Content-addressed PDF store: reports are named by a hash of everything
+    that goes into them, so a repeated request maps to the existing file.
+    Writes are atomic; old and excess files are evicted by sweep().
+    """
+
+    def __init__(self, directory, max_bytes, max_age):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def path(self, key):
+        if not _KEY_RE.match(key):
+            raise ValueError("invalid report key")
+        return os.path.join(self.directory, key + ".pdf")
+
+    def lookup(self, key):
+        """Path of the stored report, or None. Refreshes its age on a hit."""
+        try:
+            path = self.path(key)
+            os.utime(path)
+            return path
+        except (OSError, ValueError):
+            return None
+
+    def temp_path(self, key):
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f".{key}.{uuid.uuid4().hex}.tmp")
+
+    def commit(self, key, tmp_path):
+        """Atomically move a finished render into place."""
+        path = self.path(key)
+        os.replace(tmp_path, path)
+        return path
+
+    def discard(self, tmp_path):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    def sweep(self):
+        """Drop reports past max_age, then the least recently used until under max_bytes."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        now = time.time()
+        entries = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            # Leftover temp files from a crashed render count as expired after an hour.
+            stale = name.endswith(".tmp") and now - st.st_mtime > 3600
+            if stale or now - st.st_mtime > self.max_age:
+                self.discard(path)
+                continue
+            if name.endswith(".pdf"):
+                entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.discard(path)
+            total -= size
+
+
+store = ReportStore(REPORT_STORE_DIR, REPORT_STORE_MAX_BYTES, REPORT_STORE_MAX_AGE)
+
+
+def etag(key):
+    return f'"{key}"'
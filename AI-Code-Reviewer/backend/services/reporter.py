@@ -1,22 +1,188 @@
 import os
 import time
+from functools import lru_cache
+from xml.sax.saxutils import escape
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Preformatted, XPreformatted
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from utils.results import format_issue
 
+try:
+    from pygments import lex
+    from pygments.lexers import get_lexer_by_name
+    from pygments.token import Comment, Keyword, Name, Number, String
+    from pygments.util import ClassNotFound
+except ImportError:
+    lex = None
 
-def create_pdf_report(language: str, code: str, report_path: str = None):
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORTS_DIR = os.getenv("REPORTS_DIR", os.path.join(BACKEND_DIR, "reports"))
+
+# Source lines per flowable: small enough to always fit a page, so the
+# layout engine never has to split (or hold) one giant block.
+CODE_CHUNK_LINES = int(os.getenv("REPORT_CODE_CHUNK_LINES", "60"))
+# Characters per printed row (Courier 8pt across the A4 frame); longer lines wrap.
+CODE_WIDTH = 92
+# Highlighting needs pygments and costs ~2x render time; off unless asked for.
+REPORT_HIGHLIGHT = os.getenv("REPORT_HIGHLIGHT", "0") == "1"
+
+_CODE_STYLE = ParagraphStyle("CodeBlock", parent=getSampleStyleSheet()["Code"], leftIndent=0)
+
+_TOKEN_COLORS = []
+if lex is not None:
+    _TOKEN_COLORS = [
+        (Comment, "#6a737d"),
+        (String, "#22863a"),
+        (Number, "#005cc5"),
+        (Keyword, "#d73a49"),
+        (Name.Function, "#6f42c1"),
+        (Name.Class, "#6f42c1"),
+        (Name.Builtin, "#005cc5"),
+    ]
+
+_LEXER_NAMES = {"c++": "cpp", "js": "javascript"}
+
+
+def _color(ttype):
+    for parent, color in _TOKEN_COLORS:
+        if ttype in parent:
+            return color
+    return None
+
+
+@lru_cache(maxsize=8)
+def _highlighted_lines(language, code):
+    """Split code into lines of (color, text) segments; cached per submission."""
+    try:
+        lexer = get_lexer_by_name(_LEXER_NAMES.get(language, language), stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return None
+    lines = [[]]
+    for ttype, value in lex(code, lexer):
+        color = _color(ttype)
+        parts = value.split("\n")
+        for i, part in enumerate(parts):
+            if i:
+                lines.append([])
+            if part:
+                lines[-1].append((color, part))
+    return lines
+
+
+def _wrap(segments, width):
+    """Break one line's segments into rows of at most `width` characters."""
+    rows, row, used = [], [], 0
+    for color, text in segments:
+        while text:
+            room = width - used
+            if room <= 0:
+                rows.append(row)
+                row, used = [], 0
+                room = width
+            piece, text = text[:room], text[room:]
+            row.append((color, piece))
+            used += len(piece)
+    rows.append(row)
+    return rows
+
+
+def _markup(row):
+    return "".join(
+        f'<font color="{color}">{escape(text)}</font>' if color else escape(text)
+        for color, text in row
+    )
+
+
+def code_flowables(code, language="", line_numbers=True, highlight=None):
+    """
+    Render source code as a sequence of page-sized flowables, streaming it
+    line by line with optional line numbers and syntax highlighting.
+    """
+    highlight = REPORT_HIGHLIGHT if highlight is None else highlight
+    code = code.expandtabs(4)
+    source_lines = None
+    if highlight and lex is not None:
+        source_lines = _highlighted_lines(language.lower(), code)
+    if source_lines is None:
+        highlight = False
+        source_lines = ([(None, line)] for line in code.split("\n"))
+
+    total = code.count("\n") + 1
+    gutter = len(str(total)) if line_numbers else 0
+    width = CODE_WIDTH - (gutter + 3 if line_numbers else 0)
+
+    flowables, rows = [], []
+    for n, segments in enumerate(source_lines, start=1):
+        for i, row in enumerate(_wrap(segments, width)):
+            text = _markup(row) if highlight else "".join(t for _, t in row)
+            if line_numbers:
+                prefix = f"{n:>{gutter}} | " if i == 0 else " " * gutter + " : "
+                text = prefix + text
+            rows.append(text)
+        if n % CODE_CHUNK_LINES == 0:
+            flowables.append(_block(rows, highlight))
+            rows = []
+    if rows:
+        flowables.append(_block(rows, highlight))
+    return flowables
+
+
+def _block(rows, highlight):
+    text = "\n".join(rows)
+    return XPreformatted(text, _CODE_STYLE) if highlight else Preformatted(text, _CODE_STYLE)
+
+
+def _analysis_story(analysis, styles):
+    story = []
+    if not analysis:
+        story.append(Paragraph("No analysis results available.", styles["Normal"]))
+        return story
+
+    if analysis.get("error"):
+        story.append(Paragraph(escape(str(analysis["error"])), styles["Normal"]))
+
+    if analysis.get("ai_review"):
+        for block in str(analysis["ai_review"]).split("\n\n"):
+            story.append(Paragraph(escape(block).replace("\n", "<br/>"), styles["Normal"]))
+            story.append(Spacer(1, 6))
+
+    for note in analysis.get("notes") or []:
+        story.append(Paragraph(escape(str(note)), styles["Normal"]))
+
+    lint = analysis.get("lint")
+    if lint is not None:
+        story.append(Paragraph("<b>Lint</b>", styles["Heading3"]))
+        if lint:
+            text = "\n".join(f"{format_issue(item)}  [{item['severity']}]" for item in lint)
+            story.extend(code_flowables(text, line_numbers=False, highlight=False))
+        else:
+            story.append(Paragraph("No lint issues found.", styles["Normal"]))
+
+    complexity = analysis.get("complexity")
+    if complexity:
+        story.append(Paragraph("<b>Complexity</b>", styles["Heading3"]))
+        width = max(len(row["name"]) for row in complexity)
+        text = "\n".join(
+            f"{row['name']:<{width}}  lines {row['line']}-{row['end_line']}  complexity {row['complexity']}"
+            for row in complexity
+        )
+        story.extend(code_flowables(text, line_numbers=False, highlight=False))
+
+    return story
+
+
+def create_pdf_report(language: str, code: str, report_path: str = None, analysis: dict = None,
+                      line_numbers: bool = True, highlight: bool = None):
     """
-    Generate a PDF report for the given code.
+    Generate a PDF report for the given code and its analysis results.
     Saves it at `report_path` (if provided), otherwise generates a default path.
     """
 
-    reports_dir = os.path.join("backend", "reports")
-    os.makedirs(reports_dir, exist_ok=True)
+    os.makedirs(REPORTS_DIR, exist_ok=True)
 
     if report_path is None:
         timestamp = time.strftime("%Y%m%d_%H%M%S")
-        report_path = os.path.join(reports_dir, f"code_review_report_{language}_{timestamp}.pdf")
+        report_path = os.path.join(REPORTS_DIR, f"code_review_report_{language}_{timestamp}.pdf")
 
     doc = SimpleDocTemplate(report_path, pagesize=A4)
     styles = getSampleStyleSheet()
@@ -25,7 +191,7 @@ def create_pdf_report(language: str, code: str, report_path: str = None):
     story.append(Paragraph(f"<b>AI Code Review Report</b>", styles["Title"]))
     story.append(Spacer(1, 20))
 
-    story.append(Paragraph(f"<b>Language:</b> {language}", styles["Normal"]))
+    story.append(Paragraph(f"<b>Language:</b> {escape(language)}", styles["Normal"]))
     story.append(Spacer(1, 10))
 
     story.append(Paragraph(f"<b>Generated:</b> {time.ctime()}", styles["Normal"]))
@@ -33,12 +199,12 @@ def create_pdf_report(language: str, code: str, report_path: str = None):
 
     story.append(Paragraph("<b>Submitted Code:</b>", styles["Heading2"]))
     story.append(Spacer(1, 10))
-    story.append(Paragraph(f"<pre>{code}</pre>", styles["Code"]))
+    story.extend(code_flowables(code, language, line_numbers=line_numbers, highlight=highlight))
     story.append(Spacer(1, 20))
 
-    story.append(Paragraph("<b>AI Review:</b>", styles["Heading2"]))
+    story.append(Paragraph("<b>Review Results:</b>", styles["Heading2"]))
     story.append(Spacer(1, 10))
-    story.append(Paragraph("This is a placeholder AI review. Integrate your real analysis output here.", styles["Normal"]))
+    story.extend(_analysis_story(analysis, styles))
 
     doc.build(story)
 
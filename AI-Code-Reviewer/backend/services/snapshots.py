@@ -0,0 +1,89 @@
+import hashlib
+import os
+import re
+import time
+import uuid
+from utils.common import BACKEND_DIR
+
+# Previously submitted file versions, so a later edit can be sent as a diff.
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(BACKEND_DIR, ".cache", "snapshots"))
+SNAPSHOT_MAX_FILES = int(os.getenv("SNAPSHOT_MAX_FILES", "5000"))
+SNAPSHOT_MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE_DAYS", "7")) * 86400
+
+_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def version_id(language, code):
+    return hashlib.sha256(f"{language}\0{code}".encode("utf-8")).hexdigest()
+
+
+class SnapshotStore:
+    """Content-addressed source versions; the ID is a hash of language + code."""
+
+    def __init__(self, directory, max_files, max_age):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_age = max_age
+        self._writes = 0
+
+    def _path(self, vid):
+        if not _ID_RE.match(vid or ""):
+            raise ValueError("invalid version id")
+        return os.path.join(self.directory, vid + ".txt")
+
+    def get(self, vid):
+        try:
+            path = self._path(vid)
+            with open(path, encoding="utf-8") as f:
+                code = f.read()
+            os.utime(path)
+            return code
+        except (OSError, ValueError):
+            return None
+
+    def put(self, language, code):
+        vid = version_id(language, code)
+        path = self._path(vid)
+        if os.path.exists(path):
+            os.utime(path)
+            return vid
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = os.path.join(self.directory, f".{vid}.{uuid.uuid4().hex}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(code)
+        os.replace(tmp, path)
+        self._writes += 1
+        if self._writes % 64 == 0:
+            self.sweep()
+        return vid
+
+    def sweep(self):
+        """Drop snapshots past max_age, then the least recently used past max_files."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        now = time.time()
+        entries = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            if now - mtime > self.max_age or (name.endswith(".tmp") and now - mtime > 3600):
+                _remove(path)
+            elif name.endswith(".txt"):
+                entries.append((mtime, path))
+        for _, path in sorted(entries)[:max(0, len(entries) - self.max_files)]:
+            _remove(path)
+
+
+snapshots = SnapshotStore(SNAPSHOT_DIR, SNAPSHOT_MAX_FILES, SNAPSHOT_MAX_AGE)
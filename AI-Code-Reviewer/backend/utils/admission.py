@@ -0,0 +1,147 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from utils import metrics
+from utils.common import parse_limits
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+# Waiters are woken in this order; batch work only runs when no interactive request is queued.
+PRIORITIES = (INTERACTIVE, BATCH)
+
+_CPUS = os.cpu_count() or 2
+# Requests in flight per lane (one lane per language module; LLM-backed
+# languages share "llm"). Local analyzers are CPU-bound, so their default is
+# the core count; LLM calls mostly wait on the network.
+DEFAULT_LIMITS = {"llm": int(os.getenv("AI_CONCURRENCY", "8")) * 2}
+ADMISSION_LIMITS = parse_limits(os.getenv("ADMISSION_LIMITS", ""))
+# Interactive requests allowed to wait per lane before new ones get 429.
+ADMISSION_QUEUE = int(os.getenv("ADMISSION_QUEUE", str(_CPUS * 4)))
+
+
+class Overloaded(Exception):
+    def __init__(self, lane, retry_after):
+        super().__init__(f"Server busy: too many {lane} analyses queued. Retry in {retry_after}s.")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class Lane:
+    """A concurrency budget with bounded, prioritised FIFO waiting."""
+
+    def __init__(self, name, limit, max_queue):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiters = {p: deque() for p in PRIORITIES}
+        # Moving average of time a slot is held, for Retry-After.
+        self.service_time = 1.0
+        self.admitted = 0
+        self.rejected = 0
+
+    def queued(self, priority=None):
+        if priority:
+            return len(self.waiters[priority])
+        return sum(len(w) for w in self.waiters.values())
+
+    def retry_after(self):
+        return max(1, math.ceil(self.service_time * (self.queued() + 1) / self.limit))
+
+    def check(self, priority=INTERACTIVE):
+        """Fail fast, before any work is done, if a request would be rejected."""
+        if priority == INTERACTIVE and self.in_flight >= self.limit and self.queued(INTERACTIVE) >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.name, self.retry_after())
+
+    async def _acquire(self, priority):
+        if self.in_flight < self.limit and not self.queued():
+            self.in_flight += 1
+            return
+        # Batch work waits instead of failing: its producer already bounds it.
+        self.check(priority)
+        future = asyncio.get_running_loop().create_future()
+        queue = self.waiters[priority]
+        queue.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                try:
+                    queue.remove(future)
+                except ValueError:
+                    pass
+            else:
+                self._release()  # the slot was handed over just as we were cancelled
+            raise
+
+    def _release(self):
+        for priority in PRIORITIES:
+            queue = self.waiters[priority]
+            while queue:
+                future = queue.popleft()
+                if not future.done():
+                    future.set_result(None)  # hand the slot over; in_flight is unchanged
+                    return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority=INTERACTIVE):
+        queued = time.perf_counter()
+        await self._acquire(priority)
+        started = time.perf_counter()
+        self.admitted += 1
+        metrics.record("admission_wait", started - queued, self.name)
+        try:
+            yield
+        finally:
+            self.service_time += 0.2 * (time.perf_counter() - started - self.service_time)
+            self._release()
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": {p: self.queued(p) for p in PRIORITIES},
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_service_seconds": round(self.service_time, 3),
+        }
+
+
+class Admission:
+    def __init__(self, limits, max_queue):
+        self.limits = limits
+        self.max_queue = max_queue
+        self.lanes = {}
+
+    def lane(self, name):
+        lane = self.lanes.get(name)
+        if lane is None:
+            limit = self.limits.get(name) or DEFAULT_LIMITS.get(name) or _CPUS
+            lane = self.lanes[name] = Lane(name, limit, self.max_queue)
+        return lane
+
+    def stats(self):
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+    def gauges(self):
+        for name, lane in self.lanes.items():
+            yield "reviewer_admission_in_flight", {"lane": name}, lane.in_flight
+            yield "reviewer_admission_limit", {"lane": name}, lane.limit
+            for priority in PRIORITIES:
+                yield "reviewer_admission_queued", {"lane": name, "priority": priority}, lane.queued(priority)
+            yield "reviewer_admission_rejected_total", {"lane": name}, lane.rejected
+
+
+def lane_name(tool):
+    """A language module's lane: its LANE attribute, else its name (python_tools -> "python")."""
+    return getattr(tool, "LANE", None) or tool.__name__.rsplit(".", 1)[-1].replace("_tools", "")
+
+
+admission = Admission(ADMISSION_LIMITS, ADMISSION_QUEUE)
+metrics.register_gauges(admission.gauges)
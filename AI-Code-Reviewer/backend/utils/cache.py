@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from importlib import metadata
+import orjson
+from utils.registry import registry
+from utils.results import SCHEMA_VERSION
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MB = 1024 * 1024
+CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(BACKEND_DIR, ".cache", "results"))
+CACHE_MEMORY_BYTES = int(float(os.getenv("RESULT_CACHE_MEMORY_MB", "64")) * MB)
+CACHE_DISK_BYTES = int(float(os.getenv("RESULT_CACHE_DISK_MB", "512")) * MB)
+
+# Run a full disk-size check every N writes rather than on each one.
+_EVICT_EVERY = 64
+
+
+def tool_version(name):
+    """Version of an analyzer: as probed by the startup registry, else from its package metadata."""
+    return registry.version(name) or _package_version(name)
+
+
+@lru_cache(maxsize=None)
+def _package_version(name):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        pass
+    try:
+        with open(os.path.join(BACKEND_DIR, "node_modules", name, "package.json"), encoding="utf-8") as f:
+            return json.load(f).get("version", "unknown")
+    except (OSError, ValueError):
+        return "missing"
+
+
+_config_digests = {}
+
+
+def _config_digest(name):
+    path = os.path.join(BACKEND_DIR, name)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return "absent"
+    cached = _config_digests.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    _config_digests[path] = (mtime, digest)
+    return digest
+
+
+def fingerprint(tool):
+    """
+    Everything besides the code that decides a language module's output:
+    its analyzer versions (TOOLS), config files (CONFIG_FILES), CACHE_SALT
+    and the result schema version.
+    """
+    parts = [tool.__name__, SCHEMA_VERSION, getattr(tool, "CACHE_SALT", "")]
+    parts += [f"{name}={tool_version(name)}" for name in getattr(tool, "TOOLS", ())]
+    parts += [f"{name}#{_config_digest(name)}" for name in getattr(tool, "CONFIG_FILES", ())]
+    return "|".join(parts)
+
+
+def make_key(op, language, code, tool):
+    h = hashlib.sha256()
+    for part in (op, language, fingerprint(tool)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    h.update(code.encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache for JSON-serialisable results: an in-process LRU bounded
+    by bytes, backed by a directory that several uvicorn workers can share.
+    Disk entries are written atomically and evicted oldest-access first.
+    """
+
+    def __init__(self, directory, memory_bytes, disk_bytes):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._mem = OrderedDict()
+        self._mem_size = 0
+        self._disk_writes = 0
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _mem_put(self, key, data):
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_size -= len(old)
+        if len(data) > self.memory_bytes:
+            return
+        self._mem[key] = data
+        self._mem_size += len(data)
+        while self._mem_size > self.memory_bytes:
+            _, evicted = self._mem.popitem(last=False)
+            self._mem_size -= len(evicted)
+
+    def _disk_get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mtime doubles as last-access time for eviction
+            return data
+        except OSError:
+            return None
+
+    def _disk_put(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._disk_writes += 1
+        if self._disk_writes % _EVICT_EVERY == 1:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        if total <= self.disk_bytes:
+            return
+        # Trim to 90% so we don't rescan on the very next write.
+        target = self.disk_bytes * 0.9
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= target:
+                break
+
+    async def get(self, key):
+        data = self._mem.get(key)
+        if data is not None:
+            self._mem.move_to_end(key)
+            self.hits_memory += 1
+            return orjson.loads(data)
+        if self.directory and self.disk_bytes > 0:
+            data = await asyncio.to_thread(self._disk_get, key)
+            if data is not None:
+                self._mem_put(key, data)
+                self.hits_disk += 1
+                return orjson.loads(data)
+        self.misses += 1
+        return None
+
+    async def set(self, key, value):
+        data = orjson.dumps(value)
+        self._mem_put(key, data)
+        if self.directory and self.disk_bytes > 0:
+            try:
+                await asyncio.to_thread(self._disk_put, key, data)
+            except OSError:
+                pass  # the memory tier still has it
+
+    def stats(self):
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits_memory + self.hits_disk) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._mem),
+            "memory_bytes": self._mem_size,
+        }
+
+
+result_cache = ResultCache(CACHE_DIR, CACHE_MEMORY_BYTES, CACHE_DISK_BYTES)
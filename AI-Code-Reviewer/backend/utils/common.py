@@ -1,15 +1,99 @@
-import subprocess
+import asyncio
+import os
 import shutil
+import time
+from utils import metrics, sandbox
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Default wall-clock budget for a single external tool run (seconds).
+CMD_TIMEOUT = float(os.getenv("CMD_TIMEOUT", "60"))
+# How many copies of the same tool may run at once on this worker.
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", str(os.cpu_count() or 2)))
+
+_semaphores = {}
+
+
+def _tool_semaphore(tool):
+    sem = _semaphores.get(tool)
+    if sem is None:
+        sem = _semaphores[tool] = asyncio.Semaphore(TOOL_CONCURRENCY)
+    return sem
+
+
+async def run_cmd(cmd, input_text=None, timeout=None):
+    """
+    Run an external tool without blocking the event loop, under the sandbox
+    limits. Returns (returncode, stdout, stderr); a tool that runs past the
+    timeout or hits a CPU/memory limit is killed (with its children) and
+    sandbox.ResourceExceeded is raised.
+    """
+    tool = os.path.basename(cmd[0])
+    timeout = timeout or CMD_TIMEOUT
+
+    async with _tool_semaphore(tool):
+        start = time.perf_counter()
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.PIPE if input_text is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                # Own process group, so a kill also reaches helpers it spawned.
+                start_new_session=True,
+            )
+        except FileNotFoundError:
+            return 127, "", f"{tool} not found"
+        sandbox.limit_process(proc.pid, tool)
+        spawned = time.perf_counter()
+        metrics.record("spawn", spawned - start, tool)
+
+        data = input_text.encode("utf-8") if input_text is not None else None
+        try:
+            out, err = await asyncio.wait_for(proc.communicate(data), timeout)
+        except asyncio.TimeoutError:
+            sandbox.kill_group(proc)
+            await proc.wait()
+            raise sandbox.exceeded(tool, sandbox.WALL, timeout)
+        except asyncio.CancelledError:
+            sandbox.kill_group(proc)
+            await proc.wait()
+            raise
+        finally:
+            metrics.record("tool", time.perf_counter() - spawned, tool)
+
+    err = err.decode("utf-8", errors="replace").strip()
+    sandbox.check_exit(tool, proc.returncode, err)
+    return proc.returncode, out.decode("utf-8", errors="replace").strip(), err
+
+
+def parse_limits(spec):
+    """"python=8,java=2" -> {"python": 8, "java": 2}"""
+    limits = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        name, _, n = item.partition("=")
+        if n.strip().isdigit():
+            limits[name.strip().lower()] = int(n)
+    return limits
+
+
+_resolved = {}
 
-def run_cmd(cmd, input_text=None):
-    result = subprocess.run(cmd, input=input_text, capture_output=True, text=True)
-    return result.returncode, result.stdout.strip(), result.stderr.strip()
 
 def which(tool):
-    return shutil.which(tool)
+    """
+    Resolve a tool once per process: PATH first, then the backend's own
+    node_modules/.bin. Results (including misses) are memoised; the startup
+    registry (utils/registry.py) fills this in before requests arrive.
+    """
+    if tool not in _resolved:
+        local = os.path.join(BACKEND_DIR, "node_modules", ".bin", tool)
+        _resolved[tool] = shutil.which(tool) or (local if os.access(local, os.X_OK) else None)
+    return _resolved[tool]
+
 
 def tool_or_msg(tool, install_msg):
     path = which(tool)
     if not path:
-        return None, {"lint": [install_msg], "complexity": "N/A"}
+        return None, install_msg
     return path, None
@@ -0,0 +1,114 @@
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Bodies smaller than this are sent as-is; compressing them costs more than it saves.
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+
+# Streams must reach the client as they are produced, and PDFs are already compressed.
+SKIP_TYPES = (b"text/event-stream", b"application/x-ndjson", b"application/pdf")
+
+
+def _accepted(accept):
+    """Parse Accept-Encoding into {coding: q}."""
+    codings = {}
+    for part in accept.decode("latin-1").lower().split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[name] = q
+    return codings
+
+
+def _choose(accept):
+    """The client's highest-q coding we support; on a tie brotli wins. q=0 means "not this one"."""
+    codings = _accepted(accept)
+    wildcard = codings.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in ("br", "gzip"):
+        if name == "br" and brotli is None:
+            continue
+        q = codings.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def _compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESS_GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    Brotli/gzip for complete (non-streaming) responses. A response is only
+    compressed when it arrives in a single body message, which is how
+    JSONResponse sends it; streaming responses pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        encoding = _choose(headers.get(b"accept-encoding", b""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                response_headers = dict(message.get("headers", []))
+                content_type = response_headers.get(b"content-type", b"")
+                if b"content-encoding" in response_headers or content_type.startswith(SKIP_TYPES):
+                    start = False
+                    await send(message)
+                else:
+                    start = message  # held until we see the body
+                return
+
+            if start is False or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            held, start = start, False
+            body = message.get("body", b"")
+            if message.get("more_body") or len(body) < COMPRESS_MIN_BYTES:
+                await send(held)
+                await send(message)
+                return
+
+            body = _compress(body, encoding)
+            response_headers = [
+                (k, v) for k, v in held.get("headers", []) if k.lower() not in (b"content-length", b"vary")
+            ]
+            response_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**held, "headers": response_headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,7 +1,147 @@
+import asyncio
+import os
+import shutil
 import tempfile
+import time
+from contextlib import asynccontextmanager
+from utils import metrics
 
-def save_code_to_tempfile(code, suffix):
-    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False, mode="w+", encoding="utf-8") as temp:
-        temp.write(code)
-        temp.flush()
-        return temp.name
+
+def _default_base():
+    # tmpfs keeps scratch writes off the disk entirely when it is available.
+    return "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+
+
+# Always a private subdirectory: the janitor deletes what it finds in here,
+# so SCRATCH_DIR=/tmp must not mean /tmp itself.
+SCRATCH_ROOT = os.path.join(os.getenv("SCRATCH_DIR") or _default_base(), "ai-code-reviewer")
+SCRATCH_MAX_FILE_BYTES = int(float(os.getenv("SCRATCH_MAX_FILE_MB", "4")) * 1024 * 1024)
+# Total bytes this worker may have in scratch files at any one time.
+SCRATCH_QUOTA_BYTES = int(float(os.getenv("SCRATCH_QUOTA_MB", "256")) * 1024 * 1024)
+# Files older than this belong to a hung or crashed request.
+SCRATCH_STALE_SECONDS = float(os.getenv("SCRATCH_STALE_SECONDS", "600"))
+JANITOR_INTERVAL = float(os.getenv("SCRATCH_JANITOR_INTERVAL", "300"))
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+class Workspace:
+    """
+    Reusable scratch directories for tools that can only read files.
+    Each worker process owns SCRATCH_ROOT/<pid>/; slot directories inside it
+    are handed out one per request, emptied on release and reused.
+    """
+
+    def __init__(self, root, max_file_bytes, quota_bytes):
+        self.root = root
+        self.max_file_bytes = max_file_bytes
+        self.quota_bytes = quota_bytes
+        self.in_use_bytes = 0
+        self._free = []
+        self._slots = 0
+        self._pid = None
+
+    @property
+    def home(self):
+        return os.path.join(self.root, str(os.getpid()))
+
+    def _take_slot(self):
+        if self._pid != os.getpid():
+            # Forked into a new process: never share slots with the parent.
+            self._pid, self._free, self._slots = os.getpid(), [], 0
+        if self._free:
+            return self._free.pop()
+        self._slots += 1
+        path = os.path.join(self.home, f"slot-{self._slots}")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _release_slot(self, path):
+        try:
+            for name in os.listdir(path):
+                full = os.path.join(path, name)
+                if os.path.isdir(full):
+                    shutil.rmtree(full, ignore_errors=True)
+                else:
+                    os.unlink(full)
+        except OSError:
+            shutil.rmtree(path, ignore_errors=True)
+            return
+        self._free.append(path)
+
+    @asynccontextmanager
+    async def scratch_file(self, code, suffix, name="code"):
+        """Write `code` to <slot>/<name><suffix> and yield its path; always cleaned up."""
+        data = code.encode("utf-8")
+        if len(data) > self.max_file_bytes:
+            raise QuotaExceeded(f"Submission is {len(data)} bytes; limit is {self.max_file_bytes}.")
+        if self.in_use_bytes + len(data) > self.quota_bytes:
+            raise QuotaExceeded("Scratch space quota exhausted; try again shortly.")
+
+        self.in_use_bytes += len(data)
+        slot = self._take_slot()
+        try:
+            path = os.path.join(slot, name + suffix)
+            with metrics.timed("scratch_write"):
+                with open(path, "wb") as f:
+                    f.write(data)
+            yield path
+        finally:
+            self._release_slot(slot)
+            self.in_use_bytes -= len(data)
+
+    def sweep(self):
+        """
+        Remove directories of dead worker processes and stale files of live
+        ones. Only the <pid>/ directories workspaces create are touched.
+        """
+        try:
+            entries = os.listdir(self.root)
+        except OSError:
+            return 0
+        removed = 0
+        cutoff = time.time() - SCRATCH_STALE_SECONDS
+        for entry in entries:
+            path = os.path.join(self.root, entry)
+            if entry == str(os.getpid()) or not entry.isdigit() or not os.path.isdir(path):
+                continue
+            if not _pid_alive(int(entry)):
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+                continue
+            for dirpath, _, files in os.walk(path):
+                for name in files:
+                    full = os.path.join(dirpath, name)
+                    try:
+                        if os.stat(full).st_mtime < cutoff:
+                            os.unlink(full)
+                            removed += 1
+                    except OSError:
+                        pass
+        return removed
+
+    def close(self):
+        shutil.rmtree(self.home, ignore_errors=True)
+        self._free, self._slots = [], 0
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+workspace = Workspace(SCRATCH_ROOT, SCRATCH_MAX_FILE_BYTES, SCRATCH_QUOTA_BYTES)
+
+
+async def run_janitor():
+    """Background task: sweep the scratch root now and every JANITOR_INTERVAL seconds."""
+    while True:
+        await asyncio.to_thread(workspace.sweep)
+        await asyncio.sleep(JANITOR_INTERVAL)
@@ -0,0 +1,160 @@
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Set METRICS=0 to turn off histograms and the Server-Timing header.
+METRICS_ENABLED = os.getenv("METRICS", "1") == "1"
+
+# Seconds; spans in-process lint (ms) up to slow LLM round trips (minutes).
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Per-request stage totals for Server-Timing, and the language being analyzed.
+# Tasks spawned while handling a request inherit both.
+_timings = ContextVar("timings", default=None)
+_language = ContextVar("language", default="")
+
+
+class Histogram:
+    """
+    Minimal Prometheus histogram. Everything runs on the event loop thread,
+    so observe() is a bisect and a few additions with no locking.
+    """
+
+    def __init__(self, name, doc, labelnames, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, value, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            # [per-bucket counts..., +Inf count, sum]
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, labels))
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+STAGE_SECONDS = Histogram(
+    "reviewer_stage_seconds",
+    "Time spent per analysis stage (scratch write, tool spawn/run, parse, LLM, ...).",
+    ("stage", "language", "tool"),
+)
+REQUEST_SECONDS = Histogram(
+    "reviewer_request_seconds",
+    "End-to-end HTTP request time by route.",
+    ("method", "route", "status"),
+)
+HISTOGRAMS = [STAGE_SECONDS, REQUEST_SECONDS]
+
+# Callables yielding (name, labels, value) for point-in-time gauges (queue depth, ...).
+_gauge_sources = []
+
+
+def set_language(language):
+    _language.set(language)
+
+
+def record(stage, seconds, tool=""):
+    if not METRICS_ENABLED:
+        return
+    STAGE_SECONDS.observe(seconds, stage, _language.get(), tool)
+    timings = _timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage, tool=""):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, tool)
+
+
+def register_gauges(source):
+    _gauge_sources.append(source)
+
+
+def _render_gauges():
+    by_name = {}
+    for source in _gauge_sources:
+        for name, labels, value in source():
+            by_name.setdefault(name, []).append((labels, value))
+    lines = []
+    for name, samples in by_name.items():
+        lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+        for labels, value in samples:
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{base}}} {value}")
+    return lines
+
+
+def render():
+    return "\n".join([h.render() for h in HISTOGRAMS] + _render_gauges()) + "\n"
+
+
+def _server_timing(timings, total):
+    # Stage times are summed over concurrent work, so they can exceed "total".
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request and adds a Server-Timing header with the stages
+    recorded so far. For streamed responses the headers go out first, so
+    only stages finished before the first byte are listed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings = {}
+        token = _timings.set(timings)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                value = _server_timing(timings, time.perf_counter() - start)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", value.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _timings.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], path, str(status[0]))
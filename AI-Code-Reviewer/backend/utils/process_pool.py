@@ -0,0 +1,255 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import resource
+import signal
+from utils import metrics, sandbox
+from utils.common import CMD_TIMEOUT
+from utils.stages import past_deadline
+
+# Processes kept alive for in-process analyzers (python_engine, cpp_engine).
+ENGINE_WORKERS = int(os.getenv("ENGINE_WORKERS", str(os.cpu_count() or 2)))
+# Tasks a worker runs before it is replaced, so leaks in analyzers stay bounded.
+ENGINE_MAX_TASKS = int(os.getenv("ENGINE_MAX_TASKS", "1000"))
+# CPU seconds a worker may use over its life. It is the hard RLIMIT_CPU
+# (SIGKILL, which C code cannot ignore), and a worker is replaced before a
+# task could run into it, so only a task stuck past its own limit ever does.
+ENGINE_WORKER_CPU_SECONDS = float(os.getenv(
+    "ENGINE_WORKER_CPU_SECONDS", str(10 * sandbox.SANDBOX_CPU_SECONDS)
+))
+
+# Modules imported once in the fork server, so every worker starts warm.
+PRELOAD = ["services.python_engine", "services.cpp_engine", "services.chunker", "services.incremental"]
+
+
+class _CpuTimeExceeded(BaseException):
+    """Raised by SIGXCPU; a BaseException so analyzers' `except Exception` cannot swallow it."""
+
+
+_in_task = False
+
+
+def _on_sigxcpu(signum, frame):
+    if _in_task:
+        raise _CpuTimeExceeded()
+
+
+def _cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _worker_main(conn, cpu_seconds, memory_bytes, lifetime_cpu):
+    """Worker loop: receive (fn, args), reply (status, payload, cpu_seconds, retiring)."""
+    global _in_task
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the server shuts workers down itself
+    signal.signal(signal.SIGXCPU, _on_sigxcpu)
+    if memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    _, cpu_hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if cpu_seconds:
+        hard = math.ceil(_cpu_time() + max(lifetime_cpu, cpu_seconds + 1))
+        cpu_hard = hard if cpu_hard == resource.RLIM_INFINITY else min(hard, cpu_hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_hard, cpu_hard))
+
+    while True:
+        try:
+            fn, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        start = _cpu_time()
+        if cpu_seconds:
+            # RLIMIT_CPU counts the process lifetime, so each task moves the soft limit.
+            soft = math.ceil(start + cpu_seconds)
+            resource.setrlimit(resource.RLIMIT_CPU, (min(soft, cpu_hard - 1), cpu_hard))
+        _in_task = True
+        try:
+            reply = ("ok", fn(*args))
+        except _CpuTimeExceeded:
+            reply = ("limit", sandbox.CPU)
+        except MemoryError:
+            reply = ("limit", sandbox.MEMORY)
+        except Exception as e:
+            reply = ("error", e)
+        finally:
+            _in_task = False
+            if cpu_seconds:
+                resource.setrlimit(resource.RLIMIT_CPU, (cpu_hard, cpu_hard))
+        now = _cpu_time()
+        # Whatever hit a limit may have left the interpreter in a bad state.
+        retiring = reply[0] == "limit" or bool(cpu_seconds) and now + cpu_seconds + 1 > cpu_hard
+        try:
+            conn.send((*reply, now - start, retiring))
+        except Exception as e:  # unpicklable result or exception
+            conn.send(("error", RuntimeError(f"{type(e).__name__}: {e}"), now - start, retiring))
+        if retiring:
+            return
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child, sandbox.cpu_seconds(), sandbox.memory_bytes(), ENGINE_WORKER_CPU_SECONDS),
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+        self.tasks = 0
+        self.retiring = False
+        sandbox.cgroup.add(self.process.pid)
+
+    async def call(self, fn, args):
+        self.conn.send((fn, args))
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        fd = self.conn.fileno()
+        loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+        try:
+            await readable
+        finally:
+            loop.remove_reader(fd)
+        return self.conn.recv()  # EOFError if the worker died
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class EnginePool:
+    """
+    Warm analyzer processes forked from a preloaded fork server. Unlike a
+    ProcessPoolExecutor, a worker that overruns its deadline is killed and
+    replaced, so one pathological input cannot hold a core (and a pool
+    slot) for everyone else. Each worker runs under the sandbox rlimits.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._ctx = None
+        self._idle = None
+        self._workers = set()
+
+    def _start(self):
+        if self._idle is None:
+            self._ctx = multiprocessing.get_context("forkserver")
+            self._ctx.set_forkserver_preload(PRELOAD)
+            # None means "spawn on first use".
+            self._idle = asyncio.Queue()
+            for _ in range(self.size):
+                self._idle.put_nowait(None)
+
+    def _spawn(self):
+        worker = _Worker(self._ctx)
+        self._workers.add(worker)
+        return worker
+
+    def _retire(self, worker):
+        self._workers.discard(worker)
+        worker.kill()
+
+    async def _acquire(self):
+        self._start()
+        worker = await self._idle.get()
+        if worker is None or not worker.process.is_alive():
+            try:
+                # Starting the fork server (first call) imports PRELOAD; keep it off the loop.
+                worker = await asyncio.to_thread(self._spawn)
+            except BaseException:
+                self._idle.put_nowait(None)
+                raise
+        return worker
+
+    def _release(self, worker):
+        if self._idle is None:  # shut down meanwhile
+            self._retire(worker)
+            return
+        if worker.retiring or worker.tasks >= ENGINE_MAX_TASKS or not worker.process.is_alive():
+            self._retire(worker)
+            worker = None
+        self._idle.put_nowait(worker)
+
+    def _discard(self, worker):
+        self._retire(worker)
+        if self._idle is not None:
+            self._idle.put_nowait(None)
+
+    async def warm(self):
+        """Fork every worker up front instead of on the first requests."""
+        workers = [await self._acquire() for _ in range(self.size)]
+        for worker in workers:
+            self._release(worker)
+
+    async def run(self, fn, args, timeout):
+        worker = await self._acquire()
+        call = asyncio.ensure_future(worker.call(fn, args))
+        try:
+            status, payload, cpu, worker.retiring = await asyncio.wait_for(asyncio.shield(call), timeout)
+        except asyncio.CancelledError:
+            if past_deadline():
+                # The stage deadline fired: stop the work instead of letting
+                # it hold the worker for the rest of `timeout`.
+                call.cancel()
+                self._discard(worker)
+                sandbox.exceeded(fn.__name__, sandbox.WALL)
+            else:
+                # The caller went away (superseded live run); let the task
+                # finish in the background rather than kill a warm worker.
+                asyncio.ensure_future(self._finish(worker, call, timeout))
+            raise
+        except asyncio.TimeoutError:
+            call.cancel()
+            self._discard(worker)
+            raise sandbox.exceeded(fn.__name__, sandbox.WALL, timeout)
+        except (EOFError, OSError):
+            self._discard(worker)
+            raise sandbox.exceeded(fn.__name__, sandbox.KILLED)
+
+        worker.tasks += 1
+        metrics.record("engine_cpu", cpu, fn.__name__)
+        if status == "limit":
+            self._discard(worker)
+            limit = sandbox.SANDBOX_CPU_SECONDS if payload == sandbox.CPU else sandbox.SANDBOX_MEMORY_MB
+            raise sandbox.exceeded(fn.__name__, payload, limit)
+        self._release(worker)
+        if status == "error":
+            raise payload
+        return payload
+
+    async def _finish(self, worker, call, timeout):
+        try:
+            status, _, _, worker.retiring = await asyncio.wait_for(call, timeout)
+        except BaseException:
+            self._discard(worker)
+            return
+        worker.tasks += 1
+        if status == "limit":
+            self._discard(worker)
+        else:
+            self._release(worker)
+
+    def shutdown(self):
+        for worker in list(self._workers):
+            self._retire(worker)
+        self._idle = None
+
+
+pool = EnginePool(ENGINE_WORKERS)
+
+
+async def warm():
+    await pool.warm()
+
+
+async def run(fn, *args, timeout=None):
+    """Run fn(*args) in the engine pool; raises sandbox.ResourceExceeded past the deadline or a limit."""
+    # Includes the wait for a free worker, like "tool" does for run_cmd.
+    with metrics.timed("engine", fn.__name__):
+        return await pool.run(fn, args, timeout or CMD_TIMEOUT)
+
+
+def shutdown():
+    pool.shutdown()
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import re
+import time
+from importlib import metadata
+from utils.common import run_cmd, which
+from utils.sandbox import ResourceExceeded
+
+# Set WARM_TOOLS=0 to skip the dummy runs (version probing still happens).
+WARM_TOOLS = os.getenv("WARM_TOOLS", "1") == "1"
+
+# "python" tools run in-process (utils/process_pool.py), so only their
+# package version matters. "binary" tools are resolved on PATH or in
+# node_modules/.bin, probed with `version` and optionally warmed with
+# `warm` = (args, stdin) so the first real request doesn't pay for cold caches.
+TOOL_SPECS = {
+    "flake8": {"kind": "python"},
+    "radon": {"kind": "python"},
+    "black": {"kind": "python"},
+    "cpplint": {"kind": "python"},
+    "lizard": {"kind": "python"},
+    "clang-format": {
+        "kind": "binary",
+        "version": ["--version"],
+        "warm": (["--assume-filename=warmup.cpp"], "int main() { return 0; }\n"),
+    },
+    "eslint": {
+        "kind": "binary",
+        "version": ["--version"],
+        "warm": (["-c", "eslint.config.mjs", "--stdin", "--stdin-filename", "warmup.js"], "\n"),
+    },
+    "prettier": {"kind": "binary", "version": ["--version"], "warm": (["--parser", "babel"], "1;\n")},
+    "go": {"kind": "binary", "version": ["version"]},
+    # gofmt has no version flag; it ships with (and is versioned by) go.
+    "gofmt": {"kind": "binary", "warm": (["-e"], "package main\n")},
+    "java": {"kind": "binary", "version": ["-version"]},
+}
+
+_VERSION_RE = re.compile(r"\d+\.\d+(?:\.\d+)?")
+
+
+class Tool:
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.path = None
+        self.version = None
+        self.available = False
+        self.warmed = False
+        self.error = None
+
+    def to_dict(self):
+        return {
+            "available": self.available,
+            "version": self.version,
+            "path": self.path,
+            "warmed": self.warmed,
+            "error": self.error,
+        }
+
+
+class Registry:
+    """Resolves, version-probes and warms every external analyzer once at startup."""
+
+    def __init__(self, specs):
+        self.specs = specs
+        self.tools = {}
+        self.ready = False
+        self.started = None
+        self.elapsed = None
+
+    async def _probe(self, name, spec, warm):
+        tool = Tool(name, spec["kind"])
+        if spec["kind"] == "python":
+            try:
+                tool.version = metadata.version(name)
+                tool.available = True
+            except metadata.PackageNotFoundError:
+                tool.error = "package not installed"
+            return tool
+
+        tool.path = which(name)
+        if not tool.path:
+            tool.error = "not found on PATH or in node_modules/.bin"
+            return tool
+
+        if "version" in spec:
+            try:
+                rc, out, err = await run_cmd([tool.path] + spec["version"], timeout=30)
+            except ResourceExceeded as e:
+                tool.error = str(e)
+                return tool
+            match = _VERSION_RE.search(out or err)
+            if rc != 0 and not match:
+                tool.error = err or f"version probe exited with {rc}"
+                return tool
+            tool.version = match.group(0) if match else "unknown"
+        else:
+            tool.version = "unknown"
+        tool.available = True
+
+        if warm and "warm" in spec:
+            args, stdin = spec["warm"]
+            try:
+                rc, _, err = await run_cmd([tool.path] + args, input_text=stdin, timeout=60)
+                tool.warmed = rc >= 0
+            except ResourceExceeded as e:
+                tool.error = str(e)
+        return tool
+
+    async def start(self, warm=WARM_TOOLS):
+        self.started = time.time()
+        names = list(self.specs)
+        tools = await asyncio.gather(*(self._probe(n, self.specs[n], warm) for n in names))
+        self.tools = dict(zip(names, tools))
+        self.elapsed = round(time.time() - self.started, 3)
+        self.ready = True
+
+    def version(self, name):
+        tool = self.tools.get(name)
+        return tool.version if tool else None
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "startup_seconds": self.elapsed,
+            "tools": {name: tool.to_dict() for name, tool in self.tools.items()},
+        }
+
+
+registry = Registry(TOOL_SPECS)
@@ -0,0 +1,9 @@
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson: several times faster on large issue lists."""
+
+    def render(self, content):
+        return orjson.dumps(content)
@@ -0,0 +1,38 @@
+"""
+Result schema shared by every language module:
+
+    {"lint": [issue, ...], "complexity": [function, ...], "notes": [str, ...]}
+
+    issue    = {"line", "col", "code", "message", "severity"}
+    function = {"name", "line", "end_line", "complexity", ...tool extras}
+
+Lines and columns are 1-based; line 0 means the whole file. "notes" holds
+tool-level messages (tool missing, unreadable output) that are not issues.
+"""
+
+# Part of every cache key; bump it when the shape below changes.
+SCHEMA_VERSION = "2"
+
+SEVERITIES = ("error", "warning", "info")
+
+
+def issue(line, col, code, message, severity="warning"):
+    return {"line": int(line), "col": int(col), "code": code, "message": message, "severity": severity}
+
+
+def function(name, line, end_line, complexity, **extra):
+    return {"name": name, "line": int(line), "end_line": int(end_line), "complexity": int(complexity), **extra}
+
+
+def flake8_severity(code):
+    """flake8's own split: syntax errors and undefined names are errors, other pyflakes codes warnings, style info."""
+    if code.startswith(("E9", "F63", "F7", "F82")):
+        return "error"
+    if code.startswith("F"):
+        return "warning"
+    return "info"
+
+
+def format_issue(item):
+    """The familiar "line:col: CODE message" one-liner, for text output."""
+    return f"{item['line']}:{item['col']}: {item['code']} {item['message']}"
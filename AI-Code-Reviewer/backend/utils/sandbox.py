@@ -0,0 +1,172 @@
+"""
+Resource limits for analyzers running on user-submitted code: CPU-time and
+address-space rlimits, process-group kills at the wall-clock deadline and,
+when a cgroup v2 directory is configured, accounting for everything the
+analyzers use. Limit hits surface as ResourceExceeded, which callers turn
+into structured results instead of a stalled or failed request.
+"""
+import math
+import os
+import resource
+import signal
+from utils import metrics
+
+# Set SANDBOX=0 to run analyzers without rlimits (wall-clock timeouts still apply).
+SANDBOX = os.getenv("SANDBOX", "1") == "1"
+# CPU seconds per tool run / engine task, and address space per process.
+SANDBOX_CPU_SECONDS = float(os.getenv("SANDBOX_CPU_SECONDS", "30"))
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "1024"))
+# A cgroup v2 directory this service may manage, e.g. /sys/fs/cgroup/reviewer.
+# Analyzer processes are moved into it for accounting (exported on /metrics);
+# SANDBOX_CGROUP_MEMORY_MB additionally caps their combined memory.
+SANDBOX_CGROUP = os.getenv("SANDBOX_CGROUP", "")
+SANDBOX_CGROUP_MEMORY_MB = int(os.getenv("SANDBOX_CGROUP_MEMORY_MB", "0"))
+
+# V8, the JVM and the Go runtime (go vet, gofmt) reserve far more address
+# space than they touch, so an RLIMIT_AS that is sane for everything else
+# stops them from starting. Their memory is bounded by the cgroup, when
+# there is one.
+_NO_ADDRESS_LIMIT = {"node", "eslint", "prettier", "java", "go", "gofmt"}
+
+_OOM_MARKERS = ("MemoryError", "out of memory", "Cannot allocate memory", "bad_alloc")
+
+CPU = "cpu"
+MEMORY = "memory"
+WALL = "wall"
+KILLED = "killed"
+
+
+class ResourceExceeded(Exception):
+    def __init__(self, tool, resource, limit=None):
+        unit = {CPU: "s CPU", WALL: "s", MEMORY: " MB"}.get(resource, "")
+        detail = f" ({limit:g}{unit})" if limit else ""
+        super().__init__(f"{tool} stopped: {resource} limit exceeded{detail}.")
+        self.tool = tool
+        self.resource = resource
+        self.limit = limit
+
+    def to_dict(self):
+        return {"tool": self.tool, "resource": self.resource, "limit": self.limit}
+
+
+_exceeded = {}
+
+
+def exceeded(tool, resource, limit=None):
+    """Count a limit hit and return the exception to raise."""
+    _exceeded[(tool, resource)] = _exceeded.get((tool, resource), 0) + 1
+    return ResourceExceeded(tool, resource, limit)
+
+
+def memory_bytes(tool=""):
+    if not SANDBOX or tool in _NO_ADDRESS_LIMIT:
+        return 0
+    return SANDBOX_MEMORY_MB * 1024 * 1024
+
+
+def cpu_seconds():
+    return SANDBOX_CPU_SECONDS if SANDBOX else 0
+
+
+def limit_process(pid, tool):
+    """
+    Apply the limits to a freshly spawned tool. prlimit() after the spawn
+    instead of a preexec_fn, which is unsafe with the server's threads; the
+    few instructions the child runs first do not matter.
+    """
+    cgroup.add(pid)
+    if not SANDBOX:
+        return
+    cpu = math.ceil(SANDBOX_CPU_SECONDS)
+    try:
+        # Soft limit -> SIGXCPU, hard limit a second later -> SIGKILL.
+        resource.prlimit(pid, resource.RLIMIT_CPU, (cpu, cpu + 1))
+        memory = memory_bytes(tool)
+        if memory:
+            resource.prlimit(pid, resource.RLIMIT_AS, (memory, memory))
+    except (OSError, ValueError):
+        pass  # already exited
+
+
+def check_exit(tool, returncode, err):
+    """Raise ResourceExceeded if a tool died from a limit rather than on its own."""
+    if not SANDBOX or not returncode:
+        return
+    if returncode in (-signal.SIGXCPU, -signal.SIGKILL):
+        # SIGKILL here is the hard CPU limit or the kernel OOM killer.
+        raise exceeded(tool, CPU if returncode == -signal.SIGXCPU else KILLED, SANDBOX_CPU_SECONDS)
+    if memory_bytes(tool) and any(marker in err for marker in _OOM_MARKERS):
+        raise exceeded(tool, MEMORY, SANDBOX_MEMORY_MB)
+
+
+def kill_group(proc):
+    """Kill a tool started with start_new_session=True together with its children (go vet, ...)."""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class Cgroup:
+    def __init__(self, path, memory_mb=0):
+        self.path = path
+        self.enabled = False
+        if not path:
+            return
+        try:
+            os.makedirs(path, exist_ok=True)
+            self.enabled = os.access(os.path.join(path, "cgroup.procs"), os.W_OK)
+            if self.enabled and memory_mb:
+                self._write("memory.max", str(memory_mb * 1024 * 1024))
+        except OSError:
+            pass
+
+    def _write(self, name, value):
+        with open(os.path.join(self.path, name), "w") as f:
+            f.write(value)
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.path, name)) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def add(self, pid):
+        if not self.enabled:
+            return
+        try:
+            self._write("cgroup.procs", str(pid))
+        except OSError:
+            pass  # exited already, or not delegated to us
+
+    def _keyed(self, name):
+        text = self._read(name) or ""
+        return dict(line.split() for line in text.splitlines() if len(line.split()) == 2)
+
+    def gauges(self):
+        if not self.enabled:
+            return
+        usage = self._keyed("cpu.stat").get("usage_usec")
+        if usage is not None:
+            yield "reviewer_sandbox_cpu_seconds_total", {}, int(usage) / 1e6
+        for name, metric in (("memory.current", "reviewer_sandbox_memory_bytes"),
+                             ("memory.peak", "reviewer_sandbox_memory_peak_bytes")):
+            value = self._read(name)
+            if value and value.strip().isdigit():
+                yield metric, {}, int(value)
+        oom = self._keyed("memory.events").get("oom_kill")
+        if oom is not None:
+            yield "reviewer_sandbox_oom_kills_total", {}, int(oom)
+
+
+cgroup = Cgroup(SANDBOX_CGROUP, SANDBOX_CGROUP_MEMORY_MB)
+
+
+def gauges():
+    yield from cgroup.gauges()
+    for (tool, resource_name), count in _exceeded.items():
+        yield "reviewer_resource_exceeded_total", {"tool": tool, "resource": resource_name}, count
+
+
+metrics.register_gauges(gauges)
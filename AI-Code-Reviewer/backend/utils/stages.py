@@ -0,0 +1,66 @@
+import asyncio
+import contextvars
+import os
+from utils.sandbox import ResourceExceeded
+
+# Budget for a single analysis stage (one tool over one input), seconds.
+STAGE_TIMEOUT = float(os.getenv("STAGE_TIMEOUT", "30"))
+
+# Loop time at which the current stages are cut off; seen by the tasks they start.
+_deadline = contextvars.ContextVar("stage_deadline", default=None)
+
+
+def past_deadline():
+    """True once the enclosing run_stages deadline has passed (cancellation came from it)."""
+    deadline = _deadline.get()
+    # asyncio fires timers up to a clock tick early.
+    return deadline is not None and asyncio.get_running_loop().time() + 0.05 >= deadline
+
+
+async def run_stages(stages, *args, timeout=None, placeholders=None):
+    """
+    Run independent analysis stages concurrently over the same input.
+
+    `stages` maps a result key to a coroutine function called with *args; each
+    key in the returned dict gets that stage's value. Stages that miss the
+    deadline are cancelled, get their `placeholders` value instead and are
+    listed under "timed_out" (with "partial": True), so callers can still
+    return what did finish in the usual response shape. Stages stopped by a
+    sandbox limit are handled the same way and listed under
+    "resource_exceeded".
+    """
+    timeout = timeout or STAGE_TIMEOUT
+    token = _deadline.set(asyncio.get_running_loop().time() + timeout)
+    try:
+        tasks = {key: asyncio.ensure_future(fn(*args)) for key, fn in stages.items()}
+    finally:
+        _deadline.reset(token)
+    try:
+        done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+    except asyncio.CancelledError:
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    results = {}
+    timed_out = []
+    exceeded = []
+    for key, task in tasks.items():
+        if task in pending:
+            task.cancel()
+            timed_out.append(key)
+            results[key] = (placeholders or {}).get(key)
+            continue
+        try:
+            results[key] = task.result()
+        except ResourceExceeded as e:
+            exceeded.append({"stage": key, **e.to_dict()})
+            results[key] = (placeholders or {}).get(key)
+
+    if timed_out or exceeded:
+        results["partial"] = True
+    if timed_out:
+        results["timed_out"] = timed_out
+    if exceeded:
+        results["resource_exceeded"] = exceeded
+    return results
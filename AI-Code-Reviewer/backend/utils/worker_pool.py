@@ -0,0 +1,138 @@
+import asyncio
+import itertools
+import json
+from utils import metrics, sandbox
+from utils.stages import past_deadline
+
+# Largest single response line accepted from a worker (ESLint JSON for big files).
+MAX_LINE = 16 * 1024 * 1024
+
+
+class WorkerError(Exception):
+    """The pool could not serve the request (worker failed to start, broken protocol)."""
+
+
+class ToolError(WorkerError):
+    """The worker ran the request and the tool itself failed; another run would fail too."""
+
+
+class WorkerPool:
+    """
+    Pool of long-lived helper processes speaking line-delimited JSON over
+    stdin/stdout. Each worker serves one request at a time. A worker that
+    exits, answers garbage or times out is killed and respawned on its next use.
+    Timeouts and crashes raise sandbox.ResourceExceeded, since retrying the
+    same input elsewhere would only hit the limit again.
+    """
+
+    def __init__(self, name, cmd, size=2, cwd=None, timeout=30):
+        self.name = name
+        self.cmd = cmd
+        self.size = size
+        self.cwd = cwd
+        self.timeout = timeout
+        self.restarts = 0
+        self._ids = itertools.count(1)
+        self._idle = None
+        self._procs = set()
+
+    async def start(self):
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            # None means "spawn on first use"; the first requests pay startup.
+            self._idle.put_nowait(None)
+
+    async def warm(self):
+        """Spawn every worker and wait until each one answers a ping."""
+        await self.start()
+        await asyncio.gather(*(self.request("ping") for _ in range(self.size)), return_exceptions=True)
+
+    async def _spawn(self):
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *self.cmd,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                cwd=self.cwd,
+                limit=MAX_LINE,
+            )
+        except OSError as e:
+            raise WorkerError(f"{self.name} worker failed to start: {e}")
+        # Long-lived, so no lifetime CPU rlimit; requests have their own timeout.
+        sandbox.cgroup.add(proc.pid)
+        self._procs.add(proc)
+        return proc
+
+    def _kill(self, proc):
+        self._procs.discard(proc)
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+
+    async def request(self, op, timeout=None, **payload):
+        with metrics.timed("worker", f"{self.name}:{op}"):
+            return await self._request(op, timeout, payload)
+
+    async def _request(self, op, timeout, payload):
+        await self.start()
+        idle = self._idle
+        proc = await idle.get()
+        exchange = asyncio.ensure_future(self._exchange(idle, proc, op, timeout or self.timeout, payload))
+        try:
+            resp = await asyncio.shield(exchange)
+        except asyncio.CancelledError:
+            if past_deadline():
+                exchange.cancel()  # kills the worker
+            else:
+                # The caller moved on (a newer live edit): let the worker
+                # answer and go back to the pool rather than respawn it.
+                exchange.add_done_callback(lambda t: t.cancelled() or t.exception())
+            raise
+
+        if not resp.get("ok"):
+            if resp.get("unavailable"):
+                raise WorkerError(resp.get("error") or f"{self.name} worker cannot run {op}")
+            raise ToolError(resp.get("error") or f"{self.name} worker error")
+        return resp.get("result")
+
+    async def _exchange(self, idle, proc, op, timeout, payload):
+        try:
+            if proc is None or proc.returncode is not None:
+                proc = await self._spawn()
+
+            msg_id = next(self._ids)
+            proc.stdin.write((json.dumps({"id": msg_id, "op": op, **payload}) + "\n").encode("utf-8"))
+            await proc.stdin.drain()
+            line = await asyncio.wait_for(proc.stdout.readline(), timeout)
+            if not line:
+                raise sandbox.exceeded(self.name, sandbox.KILLED)
+            resp = json.loads(line)
+            if resp.get("id") != msg_id:
+                raise WorkerError(f"{self.name} worker answered out of order")
+            return resp
+        except BaseException as e:
+            # Whatever went wrong, the worker's stream state is unknown now.
+            if proc is not None:
+                self._kill(proc)
+                self.restarts += 1
+                proc = None
+            if isinstance(e, asyncio.TimeoutError):
+                raise sandbox.exceeded(self.name, sandbox.WALL, timeout) from e
+            if isinstance(e, (OSError, ValueError)):
+                raise WorkerError(f"{self.name} worker failed: {e}") from e
+            raise
+        finally:
+            idle.put_nowait(proc)
+
+    async def close(self):
+        procs = list(self._procs)
+        for proc in procs:
+            self._kill(proc)
+        for proc in procs:
+            await proc.wait()
+        self._idle = None
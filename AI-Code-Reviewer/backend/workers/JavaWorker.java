@@ -0,0 +1,451 @@
+// Long-lived google-java-format / Checkstyle worker for services/java_tools.
+//
+// Protocol: one JSON request per line on stdin, one JSON response per line
+// on stdout (same as workers/js_worker.mjs).
+//   request:  {"id": 1, "op": "lint" | "format" | "ping", "code": "..."}
+//   response: {"id": 1, "ok": true, "result": ...} or {"id": 1, "ok": false, "error": "..."}
+//
+// "unavailable": true on an error means the formatter or Checkstyle failed to
+// load, so the result says nothing about the code and is not cached.
+//
+// "lint" returns issue records ({"line", "col", "code", "message", "severity"})
+// from Checkstyle's google_checks.xml (or $CHECKSTYLE_CONFIG). The formatter
+// and the configured Checker are built once, so after the first request the
+// JVM is warm and each call costs milliseconds.
+//
+// Launched in source-file mode, so there is no build step:
+//   java -cp "tools/java/*" workers/JavaWorker.java
+
+import com.google.googlejavaformat.java.Formatter;
+import com.puppycrawl.tools.checkstyle.Checker;
+import com.puppycrawl.tools.checkstyle.ConfigurationLoader;
+import com.puppycrawl.tools.checkstyle.PropertiesExpander;
+import com.puppycrawl.tools.checkstyle.api.AuditEvent;
+import com.puppycrawl.tools.checkstyle.api.AuditListener;
+import com.puppycrawl.tools.checkstyle.api.Configuration;
+import java.io.BufferedReader;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.util.ArrayList;
+import java.util.Collection;
+import java.util.Collections;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.regex.Matcher;
+import java.util.regex.Pattern;
+
+public class JavaWorker {
+  // Checkstyle's OuterTypeFilename check wants the file named after the public type.
+  private static final Pattern PUBLIC_TYPE =
+      Pattern.compile(
+          "public\\s+(?:(?:final|abstract|sealed|static|strictfp)\\s+)*"
+              + "(?:class|interface|enum|record|@interface)\\s+(\\w+)");
+
+  private static Formatter formatter;
+  private static String formatterError;
+  private static Checker checker;
+  private static String checkerError;
+  private static Path scratch;
+  private static final List<Map<String, Object>> events = new ArrayList<>();
+
+  public static void main(String[] args) throws Exception {
+    PrintStream out = new PrintStream(new FileOutputStream(FileDescriptor.out), false, "UTF-8");
+    // Checkstyle may print to System.out; stdout is reserved for the protocol.
+    System.setOut(System.err);
+
+    try {
+      formatter = new Formatter();
+      formatter.formatSource("class Warmup {}\n");
+    } catch (Throwable e) {
+      formatterError = String.valueOf(e);
+    }
+    try {
+      scratch = Files.createTempDirectory("java-worker");
+      scratch.toFile().deleteOnExit();
+      checker = createChecker();
+      lint("class Warmup {}\n");
+    } catch (Throwable e) {
+      checker = null;
+      checkerError = String.valueOf(e);
+    }
+
+    BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+    String line;
+    // One request at a time: the Python pool never sends a second one before the reply.
+    while ((line = in.readLine()) != null) {
+      Object id = null;
+      String response;
+      try {
+        Map<String, Object> req = Json.parseObject(line);
+        id = req.get("id");
+        Object result = handle(req);
+        response = "{\"id\":" + Json.write(id) + ",\"ok\":true,\"result\":" + Json.write(result) + "}";
+      } catch (Throwable e) {
+        String message = e.getMessage() != null ? e.getMessage() : String.valueOf(e);
+        response = "{\"id\":" + Json.write(id) + ",\"ok\":false,\"error\":" + Json.write(message)
+            + (e instanceof Unavailable ? ",\"unavailable\":true}" : "}");
+      }
+      out.print(response);
+      out.print("\n");
+      out.flush();
+    }
+  }
+
+  private static Object handle(Map<String, Object> req) throws Exception {
+    String op = String.valueOf(req.get("op"));
+    String code = req.get("code") == null ? "" : String.valueOf(req.get("code"));
+    switch (op) {
+      case "ping":
+        {
+          Map<String, Object> status = new LinkedHashMap<>();
+          status.put("format", formatterError == null);
+          status.put("lint", checkerError == null);
+          return status;
+        }
+      case "format":
+        if (formatter == null) {
+          throw new Unavailable("google-java-format unavailable: " + formatterError);
+        }
+        return formatter.formatSource(code);
+      case "lint":
+        if (checker == null) {
+          throw new Unavailable("Checkstyle unavailable: " + checkerError);
+        }
+        return lint(code);
+      default:
+        throw new IllegalArgumentException("unknown op: " + op);
+    }
+  }
+
+  /** A tool that failed to load; the Python side reports it as "unavailable" rather than a lint result. */
+  private static final class Unavailable extends IllegalStateException {
+    Unavailable(String message) {
+      super(message);
+    }
+  }
+
+  private static Checker createChecker() throws Exception {
+    String config = System.getenv().getOrDefault("CHECKSTYLE_CONFIG", "/google_checks.xml");
+    Configuration configuration =
+        ConfigurationLoader.loadConfiguration(config, new PropertiesExpander(System.getProperties()));
+    Checker c = new Checker();
+    c.setModuleClassLoader(Checker.class.getClassLoader());
+    c.configure(configuration);
+    c.addListener(new Collector());
+    return c;
+  }
+
+  private static List<Map<String, Object>> lint(String code) throws Exception {
+    Matcher m = PUBLIC_TYPE.matcher(code);
+    Path file = scratch.resolve((m.find() ? m.group(1) : "Code") + ".java");
+    Files.write(file, code.getBytes(StandardCharsets.UTF_8));
+    events.clear();
+    try {
+      checker.process(Collections.singletonList(file.toFile()));
+    } catch (Exception e) {
+      // Unparseable source: report it like any other finding.
+      Throwable root = e;
+      while (root.getCause() != null) {
+        root = root.getCause();
+      }
+      events.add(issue(0, 0, "parse", String.valueOf(root.getMessage()), "error"));
+    } finally {
+      Files.deleteIfExists(file);
+    }
+    return new ArrayList<>(events);
+  }
+
+  private static Map<String, Object> issue(int line, int col, String code, String message, String severity) {
+    Map<String, Object> m = new LinkedHashMap<>();
+    m.put("line", line);
+    m.put("col", col);
+    m.put("code", code);
+    m.put("message", message);
+    m.put("severity", severity);
+    return m;
+  }
+
+  private static final class Collector implements AuditListener {
+    @Override
+    public void auditStarted(AuditEvent event) {}
+
+    @Override
+    public void auditFinished(AuditEvent event) {}
+
+    @Override
+    public void fileStarted(AuditEvent event) {}
+
+    @Override
+    public void fileFinished(AuditEvent event) {}
+
+    @Override
+    public void addError(AuditEvent event) {
+      String source = event.getSourceName();
+      String check = source.substring(source.lastIndexOf('.') + 1);
+      if (check.endsWith("Check")) {
+        check = check.substring(0, check.length() - "Check".length());
+      }
+      events.add(
+          issue(
+              event.getLine(),
+              event.getColumn(),
+              check,
+              event.getMessage(),
+              event.getSeverityLevel().getName()));
+    }
+
+    @Override
+    public void addException(AuditEvent event, Throwable throwable) {
+      events.add(issue(0, 0, "checkstyle", String.valueOf(throwable.getMessage()), "error"));
+    }
+  }
+
+  /** Just enough JSON for the protocol: flat requests in, issue lists out. */
+  static final class Json {
+    static Map<String, Object> parseObject(String text) {
+      Parser p = new Parser(text);
+      Object value = p.value();
+      if (!(value instanceof Map)) {
+        throw new IllegalArgumentException("bad request: expected a JSON object");
+      }
+      @SuppressWarnings("unchecked")
+      Map<String, Object> map = (Map<String, Object>) value;
+      return map;
+    }
+
+    static String write(Object value) {
+      StringBuilder sb = new StringBuilder();
+      write(value, sb);
+      return sb.toString();
+    }
+
+    private static void write(Object value, StringBuilder sb) {
+      if (value == null) {
+        sb.append("null");
+      } else if (value instanceof String) {
+        quote((String) value, sb);
+      } else if (value instanceof Number || value instanceof Boolean) {
+        sb.append(value);
+      } else if (value instanceof Map) {
+        sb.append('{');
+        boolean first = true;
+        for (Map.Entry<?, ?> e : ((Map<?, ?>) value).entrySet()) {
+          if (!first) {
+            sb.append(',');
+          }
+          first = false;
+          quote(String.valueOf(e.getKey()), sb);
+          sb.append(':');
+          write(e.getValue(), sb);
+        }
+        sb.append('}');
+      } else if (value instanceof Collection) {
+        sb.append('[');
+        boolean first = true;
+        for (Object item : (Collection<?>) value) {
+          if (!first) {
+            sb.append(',');
+          }
+          first = false;
+          write(item, sb);
+        }
+        sb.append(']');
+      } else {
+        quote(String.valueOf(value), sb);
+      }
+    }
+
+    private static void quote(String s, StringBuilder sb) {
+      sb.append('"');
+      for (int i = 0; i < s.length(); i++) {
+        char c = s.charAt(i);
+        switch (c) {
+          case '"':
+            sb.append("\\\"");
+            break;
+          case '\\':
+            sb.append("\\\\");
+            break;
+          case '\n':
+            sb.append("\\n");
+            break;
+          case '\r':
+            sb.append("\\r");
+            break;
+          case '\t':
+            sb.append("\\t");
+            break;
+          default:
+            if (c < 0x20) {
+              sb.append(String.format("\\u%04x", (int) c));
+            } else {
+              sb.append(c);
+            }
+        }
+      }
+      sb.append('"');
+    }
+
+    private static final class Parser {
+      private final String s;
+      private int i;
+
+      Parser(String s) {
+        this.s = s;
+      }
+
+      Object value() {
+        ws();
+        if (i >= s.length()) {
+          throw new IllegalArgumentException("bad request: unexpected end of input");
+        }
+        char c = s.charAt(i);
+        switch (c) {
+          case '{':
+            return object();
+          case '[':
+            return array();
+          case '"':
+            return string();
+          case 't':
+            return literal("true", Boolean.TRUE);
+          case 'f':
+            return literal("false", Boolean.FALSE);
+          case 'n':
+            return literal("null", null);
+          default:
+            return number();
+        }
+      }
+
+      private Map<String, Object> object() {
+        Map<String, Object> map = new LinkedHashMap<>();
+        i++; // {
+        ws();
+        if (peek() == '}') {
+          i++;
+          return map;
+        }
+        while (true) {
+          ws();
+          String key = string();
+          ws();
+          expect(':');
+          map.put(key, value());
+          ws();
+          if (peek() == ',') {
+            i++;
+            continue;
+          }
+          expect('}');
+          return map;
+        }
+      }
+
+      private List<Object> array() {
+        List<Object> list = new ArrayList<>();
+        i++; // [
+        ws();
+        if (peek() == ']') {
+          i++;
+          return list;
+        }
+        while (true) {
+          list.add(value());
+          ws();
+          if (peek() == ',') {
+            i++;
+            continue;
+          }
+          expect(']');
+          return list;
+        }
+      }
+
+      private String string() {
+        expect('"');
+        StringBuilder sb = new StringBuilder();
+        while (true) {
+          char c = s.charAt(i++);
+          if (c == '"') {
+            return sb.toString();
+          }
+          if (c != '\\') {
+            sb.append(c);
+            continue;
+          }
+          char e = s.charAt(i++);
+          switch (e) {
+            case 'n':
+              sb.append('\n');
+              break;
+            case 'r':
+              sb.append('\r');
+              break;
+            case 't':
+              sb.append('\t');
+              break;
+            case 'b':
+              sb.append('\b');
+              break;
+            case 'f':
+              sb.append('\f');
+              break;
+            case 'u':
+              sb.append((char) Integer.parseInt(s.substring(i, i + 4), 16));
+              i += 4;
+              break;
+            default: // " \ /
+              sb.append(e);
+          }
+        }
+      }
+
+      private Object number() {
+        int start = i;
+        while (i < s.length() && "+-0123456789.eE".indexOf(s.charAt(i)) >= 0) {
+          i++;
+        }
+        String n = s.substring(start, i);
+        if (n.isEmpty()) {
+          throw new IllegalArgumentException("bad request: unexpected character at " + start);
+        }
+        if (n.contains(".") || n.contains("e") || n.contains("E")) {
+          return Double.parseDouble(n);
+        }
+        return Long.parseLong(n);
+      }
+
+      private Object literal(String word, Object value) {
+        if (!s.startsWith(word, i)) {
+          throw new IllegalArgumentException("bad request: unexpected token at " + i);
+        }
+        i += word.length();
+        return value;
+      }
+
+      private char peek() {
+        return i < s.length() ? s.charAt(i) : '\0';
+      }
+
+      private void expect(char c) {
+        if (peek() != c) {
+          throw new IllegalArgumentException("bad request: expected '" + c + "' at " + i);
+        }
+        i++;
+      }
+
+      private void ws() {
+        while (i < s.length() && Character.isWhitespace(s.charAt(i))) {
+          i++;
+        }
+      }
+    }
+  }
+}
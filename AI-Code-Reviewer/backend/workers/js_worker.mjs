@@ -0,0 +1,97 @@
+// Long-lived ESLint/Prettier worker for services/javascript_tools.
+//
+// Protocol: one JSON request per line on stdin, one JSON response per line
+// on stdout.
+//   request:  {"id": 1, "op": "lint" | "format" | "ping", "code": "...", "language": "javascript"}
+//   response: {"id": 1, "ok": true, "result": ...} or {"id": 1, "ok": false, "error": "..."}
+//
+// "unavailable": true on an error means the tool could not be loaded here,
+// so the Python side falls back to the CLI instead of reporting the error.
+//
+// "lint" returns the same array `eslint -f json` prints, so the Python side
+// parses both paths identically. ESLint and Prettier are loaded once and the
+// resolved config is cached by ESLint across lintText() calls.
+import path from "node:path";
+import readline from "node:readline";
+
+const cwd = process.cwd();
+const configFile = process.env.ESLINT_CONFIG || path.join(cwd, "eslint.config.mjs");
+
+let eslint = null;
+let eslintError = null;
+let prettier = null;
+let prettierError = null;
+
+try {
+  const { ESLint } = await import("eslint");
+  eslint = new ESLint({ cwd, overrideConfigFile: configFile });
+  // Resolve and cache the config before the first real request arrives.
+  await eslint.lintText("", { filePath: path.join(cwd, "warmup.js") });
+} catch (e) {
+  eslintError = String(e && e.message ? e.message : e);
+}
+
+try {
+  prettier = await import("prettier");
+} catch (e) {
+  prettierError = String(e && e.message ? e.message : e);
+}
+
+function unavailable(message) {
+  const e = new Error(message);
+  e.unavailable = true;
+  return e;
+}
+
+async function handle(req) {
+  const language = req.language || "javascript";
+  switch (req.op) {
+    case "ping":
+      return { eslint: !eslintError, prettier: !prettierError };
+    case "lint": {
+      if (!eslint) throw unavailable("ESLint unavailable: " + eslintError);
+      const ext = language === "typescript" ? ".ts" : ".js";
+      return await eslint.lintText(req.code, { filePath: path.join(cwd, "dummy" + ext) });
+    }
+    case "format": {
+      if (!prettier) throw unavailable("Prettier unavailable: " + prettierError);
+      const parser = language === "typescript" ? "typescript" : "babel";
+      return await prettier.format(req.code, { parser });
+    }
+    default:
+      throw new Error("unknown op: " + req.op);
+  }
+}
+
+function reply(msg) {
+  process.stdout.write(JSON.stringify(msg) + "\n");
+}
+
+const rl = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+
+// Requests are answered in arrival order; the Python pool sends one at a time
+// per worker, so there is no interleaving to worry about.
+let chain = Promise.resolve();
+rl.on("line", (line) => {
+  chain = chain.then(async () => {
+    let req;
+    try {
+      req = JSON.parse(line);
+    } catch (e) {
+      reply({ id: null, ok: false, error: "bad request: " + e.message });
+      return;
+    }
+    try {
+      reply({ id: req.id, ok: true, result: await handle(req) });
+    } catch (e) {
+      reply({
+        id: req.id,
+        ok: false,
+        error: String(e && e.message ? e.message : e),
+        unavailable: Boolean(e && e.unavailable),
+      });
+    }
+  });
+});
+
+rl.on("close", () => process.exit(0));
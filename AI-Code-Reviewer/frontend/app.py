@@ -1,10 +1,13 @@
 # Optional: create a .env in the same folder with BACKEND_URL=http://127.0.0.1:8000
 import io
 import os
+import json
 import time
 import base64
+import hashlib
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
 from typing import Tuple, Dict, Any
 
 try:
@@ -15,6 +18,7 @@ except Exception:
 
 BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
 ANALYZE_ENDPOINT = f"{BACKEND_URL}/api/analyze"
+ANALYZE_STREAM_ENDPOINT = f"{BACKEND_URL}/api/analyze/stream"
 REPORT_ENDPOINT = f"{BACKEND_URL}/api/report"
 
 SUPPORTED_LANGS = [
@@ -28,9 +32,9 @@ SUPPORTED_LANGS = [
 LANG_LABELS = {
     "python": "Python",
     "javascript": "JavaScript",
-    "java": "Java (AI-only)",
+    "java": "Java",
     "cpp": "C/C++",
-    "go": "Go (AI-only)",
+    "go": "Go",
 }
 
 st.set_page_config(page_title="AI-Code-Reviewer", page_icon="🧠", layout="wide")
@@ -127,21 +131,104 @@ def _multipart_for_upload(uploaded) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     return data, files
 
 
-def call_backend(endpoint: str, language: str, files: Dict[str, Any]) -> Dict[str, Any]:
-    data = {"language": language}
+class BackendError(Exception):
+    pass
+
+
+class _NotCached(Exception):
+    pass
+
+
+@st.cache_resource
+def http_session() -> requests.Session:
+    """One pooled session for the whole Streamlit server, so reruns reuse connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def analysis_key(language: str, code: str) -> str:
+    """Hash of language + code; the same value the backend returns as `analysis_id`."""
+    return hashlib.sha256(f"{language}\0{code}".encode("utf-8")).hexdigest()
+
+
+@st.cache_data(ttl=3600, max_entries=128, show_spinner=False)
+def cached_analysis(endpoint: str, language: str, code_hash: str, ai_review: bool, _result=None) -> Dict[str, Any]:
+    """
+    Analysis results per code hash. Called without `_result` it is a lookup
+    that raises _NotCached on a miss (exceptions are not cached); called
+    with it, it stores the result.
+    """
+    if _result is None:
+        raise _NotCached
+    return _result
+
+
+def stream_backend(endpoint: str, language: str, files: Dict[str, Any], ai_review: bool = False):
+    """Yield (event, data) pairs from the server-sent-events analyze endpoint."""
+    data = {"language": language, "ai_review": str(ai_review).lower()}
     try:
-        resp = requests.post(endpoint, data=data, files=files, timeout=120)
-        if resp.status_code == 200:
-            try:
-                return resp.json()
-            except Exception:
-                return {"_raw": resp.content, "_headers": dict(resp.headers)}
-        else:
+        with http_session().post(endpoint, data=data, files=files, stream=True, timeout=(10, 120)) as resp:
+            if resp.status_code != 200:
+                yield "error", {"error": f"HTTP {resp.status_code}: {resp.text}"}
+                return
+            if not resp.headers.get("content-type", "").startswith("text/event-stream"):
+                yield "result", resp.json()
+                return
+            resp.encoding = "utf-8"
+            event = "message"
+            for line in resp.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    yield event, json.loads(line[5:].strip())
+    except Exception as e:
+        yield "error", {"error": str(e)}
+
+
+def request_report(language: str, files: Dict[str, Any], code_hash: str, ai_review: bool = False,
+                   poll_timeout: float = 300) -> Dict[str, Any]:
+    """Queue a report job, long-poll until it finishes and return the PDF bytes as {"_raw": ...}."""
+    session = http_session()
+    data = {"language": language, "ai_review": str(ai_review).lower()}
+    try:
+        # The backend keeps analyzed sources by hash, so usually the ID is enough.
+        resp = session.post(REPORT_ENDPOINT, data={**data, "analysis_id": code_hash}, timeout=30)
+        if resp.status_code == 404:
+            resp = session.post(REPORT_ENDPOINT, data=data, files=files, timeout=120)
+        if not resp.ok:
             return {"error": f"HTTP {resp.status_code}: {resp.text}"}
+        job = resp.json()
+        if "error" in job or "job_id" not in job:
+            return job if "error" in job else {"error": f"Unexpected response: {job}"}
+
+        status_url = f"{REPORT_ENDPOINT}/{job['job_id']}"
+        deadline = time.time() + poll_timeout
+        while job.get("status") in ("queued", "running"):
+            if time.time() > deadline:
+                return {"error": "Timed out waiting for the report."}
+            job = session.get(status_url, params={"wait": 25}, timeout=40).json()
+        if job.get("status") != "done":
+            return {"error": f"Report {job.get('status')}: {job.get('error')}"}
+        resp = session.get(f"{status_url}/download", timeout=60)
+        if resp.status_code != 200:
+            return {"error": f"HTTP {resp.status_code}: {resp.text}"}
+        return {"_raw": resp.content, "_headers": dict(resp.headers)}
     except Exception as e:
         return {"error": str(e)}
 
 
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def report_pdf(endpoint: str, language: str, code_hash: str, ai_review: bool, _files=None) -> Dict[str, Any]:
+    """Report per code hash; failures raise BackendError so they are not cached."""
+    result = request_report(language, _files, code_hash, ai_review)
+    if "error" in result:
+        raise BackendError(result["error"])
+    return result
+
+
 def download_button_bytes(filename: str, data: bytes, mime: str = "application/octet-stream"):
     b64 = base64.b64encode(data).decode()
     href = f'<a href="data:{mime};base64,{b64}" download="{filename}">📄 Download {filename}</a>'
@@ -154,6 +241,7 @@ st.sidebar.caption("Frontend for your FastAPI backend")
 selected_lang = st.sidebar.selectbox("Language", SUPPORTED_LANGS, format_func=lambda x: LANG_LABELS.get(x, x))
 
 mode = st.sidebar.radio("Action", ["Analyze", "Report"], index=0)
+include_ai = st.sidebar.checkbox("Include AI review", value=False, help="Adds an LLM review; local linting is always run.")
 
 st.sidebar.markdown("---")
 st.sidebar.subheader("Backend")
@@ -166,6 +254,7 @@ if st.sidebar.button("Apply URL"):
 if "_BACKEND_URL" in st.session_state:
     _b = st.session_state["_BACKEND_URL"]
     ANALYZE_ENDPOINT = f"{_b}/api/analyze"
+    ANALYZE_STREAM_ENDPOINT = f"{_b}/api/analyze/stream"
     REPORT_ENDPOINT = f"{_b}/api/report"
 
 st.sidebar.markdown("---")
@@ -174,7 +263,8 @@ st.sidebar.write("Tip: Paste code below or upload a file.")
 st.title("AI-Code-Reviewer")
 st.write(
     "Upload code or paste it below, choose a language, and run analysis. "
-    "Java & Go use AI-only review. JS/Python/C++ show linter output if tools are present."
+    "Linter and complexity output comes from local tools when they are installed; "
+    "tick \"Include AI review\" for an additional LLM review."
 )
 
 col1, col2 = st.columns([2, 1], gap="large")
@@ -207,17 +297,48 @@ if run_clicked:
     else:
         st.warning("Please paste code or upload a file first.")
         st.stop()
+    code_hash = analysis_key(selected_lang, files["file"][1].decode("utf-8", errors="replace"))
 
-    with st.spinner("Contacting backend..."):
+    review_box = None
+    first_token = None
+    cached = False
+    if mode == "Analyze":
+        kpi_box = st.empty()
         start = time.time()
-        if mode == "Analyze":
-            result = call_backend(ANALYZE_ENDPOINT, selected_lang, files)
-        else:
-            result = call_backend(REPORT_ENDPOINT, selected_lang, files)
+        try:
+            result = cached_analysis(ANALYZE_STREAM_ENDPOINT, selected_lang, code_hash, include_ai)
+            cached = True
+        except _NotCached:
+            # Stream the response so AI review text shows up as soon as it is generated.
+            kpi_box.info("Contacting backend...")
+            result = {"error": "No response from backend."}
+            tokens = []
+            for event, payload in stream_backend(ANALYZE_STREAM_ENDPOINT, selected_lang, files, include_ai):
+                if event == "token":
+                    if review_box is None:
+                        first_token = time.time() - start
+                        review_box = st.expander("🤖 AI Review", expanded=True).empty()
+                    tokens.append(payload.get("text", ""))
+                    review_box.markdown("".join(tokens))
+                elif event in ("result", "error"):
+                    result = payload
+            if "error" not in result and not result.get("partial"):
+                cached_analysis(ANALYZE_STREAM_ENDPOINT, selected_lang, code_hash, include_ai, _result=result)
         elapsed = time.time() - start
-
-    st.markdown(
-        f"<div class='kpi'>📄 <b>File</b>: {filename_display} &nbsp;&nbsp; ⏱️ <b>Time</b>: {elapsed:.2f}s</div>",
+    else:
+        kpi_box = st.empty()
+        with st.spinner("Contacting backend..."):
+            start = time.time()
+            try:
+                result = report_pdf(REPORT_ENDPOINT, selected_lang, code_hash, include_ai, _files=files)
+            except BackendError as e:
+                result = {"error": str(e)}
+            elapsed = time.time() - start
+
+    ttfb = f" &nbsp;&nbsp; ⚡ <b>First token</b>: {first_token:.2f}s" if first_token is not None else ""
+    ttfb += " &nbsp;&nbsp; ♻️ <b>Cached</b>" if cached else ""
+    kpi_box.markdown(
+        f"<div class='kpi'>📄 <b>File</b>: {filename_display} &nbsp;&nbsp; ⏱️ <b>Time</b>: {elapsed:.2f}s{ttfb}</div>",
         unsafe_allow_html=True,
     )
     st.markdown("\n")
@@ -240,29 +361,30 @@ if run_clicked:
         st.error(result["error"])
         st.stop()
 
-    if "ai_review" in result:
+    if "ai_review" in result and review_box is None:
         with st.expander("🤖 AI Review", expanded=True):
             st.markdown(result["ai_review"])
 
+    for note in result.get("notes") or []:
+        st.warning(note)
+
     if "lint" in result or "complexity" in result:
         colL, colR = st.columns(2)
         with colL:
             st.subheader("Lint")
             lint = result.get("lint")
-            if isinstance(lint, list):
-                if len(lint) == 0:
-                    st.success("No lint issues found.")
-                else:
-                    st.code("\n".join(lint), language="bash")
-            elif isinstance(lint, str):
-                st.code(lint, language="bash")
+            if lint:
+                # Issue records: line, col, code, message, severity.
+                st.dataframe(lint, use_container_width=True, hide_index=True)
+            elif isinstance(lint, list):
+                st.success("No lint issues found.")
             else:
                 st.info("No lint output.")
         with colR:
             st.subheader("Complexity")
             comp = result.get("complexity")
-            if isinstance(comp, str):
-                st.code(comp or "N/A", language="bash")
+            if comp:
+                st.dataframe(comp, use_container_width=True, hide_index=True)
             else:
                 st.info("No complexity output.")
 